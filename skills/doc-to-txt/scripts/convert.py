@@ -10,95 +10,198 @@
 Convert DOC, DOCX, and PDF files to TXT format.
 
 Usage:
-    uv run convert.py <input_file> [--output <output_file>]
+    uv run convert.py <input_file> [--output <output_file>] [--workers N] [--index] [--pages A-B] [--resume]
+    uv run convert.py <directory | 'glob/**/*.pdf'> [--output <output_dir>] [--workers N] [--force] [--index] [--resume]
 """
 
 import argparse
+import glob
+import hashlib
+import json
 import os
+import re
 import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.etree import ElementTree
+
+from reflow import Reflow, reflow_lines
+
+PAGES_PER_CHUNK = 8
+# Bump whenever extraction output changes, so batch runs reconvert everything.
+CONVERTER_VERSION = 5
+SUPPORTED_EXTENSIONS = ('.doc', '.docx', '.pdf')
+MANIFEST_NAME = '.doc-to-txt-manifest.json'
+MANIFEST_SAVE_EVERY = 50
+CHECKPOINT_PAGES = 50
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+PART_SUFFIX = '.part'
+NOVEL_READER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'novel-reader')
+
+
+WORD_NAMESPACES = (
+    'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+    'http://purl.oclc.org/ooxml/wordprocessingml/main',
+)
+# Runs' inline content with a fixed text equivalent, as python-docx renders it.
+DOCX_INLINE_TEXT = {'tab': '\t', 'ptab': '\t', 'cr': '\n', 'noBreakHyphen': '-'}
+DOCX_NOTE_PARTS = ('word/footnotes.xml', 'word/endnotes.xml')
+# Markup-compatibility fallback: a second copy of content (e.g. a VML text box) for older readers.
+DOCX_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+
+def _word_parts(names):
+    """Text-bearing parts in reading order: headers, body, notes, footers."""
+    def numbered(prefix):
+        pattern = re.compile(rf'word/{prefix}(\d*)\.xml$')
+        found = [(int(m.group(1) or 0), name) for name in names for m in [pattern.match(name)] if m]
+        return [name for _, name in sorted(found)]
+
+    parts = numbered('header') + ['word/document.xml']
+    parts += [name for name in DOCX_NOTE_PARTS if name in names]
+    return parts + numbered('footer')
+
+
+def iter_docx_part(stream):
+    """Yield the text of every paragraph in one WordprocessingML part.
+
+    Streams with iterparse and drops each element once it has ended, so
+    memory stays flat however large the part is. Paragraphs inside tables,
+    text boxes and notes are included; deleted text, field codes, the
+    separator pseudo-notes and mc:Fallback copies of text boxes are not.
+    """
+    buffers = []
+    stack = []
+    skip = 0
+    fallback = 0
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        if elem.tag == DOCX_FALLBACK:
+            fallback += 1 if event == 'start' else -1
+        ns, _, tag = elem.tag[1:].partition('}')
+        word = ns in WORD_NAMESPACES
+        if event == 'start':
+            stack.append(elem)
+            if word and tag == 'p':
+                buffers.append([])
+            elif word and tag in ('footnote', 'endnote') and any(k.endswith('}type') for k in elem.attrib):
+                skip += 1
+            continue
+
+        stack.pop()
+        if word and tag == 'p':
+            text = ''.join(buffers.pop())
+            if not skip and not fallback:
+                yield text
+        elif word and not fallback:
+            if tag == 't' and buffers and elem.text:
+                buffers[-1].append(elem.text)
+            elif tag in DOCX_INLINE_TEXT and buffers:
+                buffers[-1].append(DOCX_INLINE_TEXT[tag])
+            elif tag == 'br' and buffers:
+                kind = next((v for k, v in elem.attrib.items() if k.endswith('}type')), 'textWrapping')
+                if kind == 'textWrapping':
+                    buffers[-1].append('\n')
+            elif tag in ('footnote', 'endnote') and any(k.endswith('}type') for k in elem.attrib):
+                skip -= 1
+        if stack:
+            del stack[-1][-1]
+
+
+def iter_docx_paragraphs(file_path):
+    """Stream paragraph texts straight from the DOCX zip, part by part."""
+    with zipfile.ZipFile(file_path) as archive:
+        parts = _word_parts(set(archive.namelist()))
+        for i, part in enumerate(parts):
+            if i:
+                yield ''
+            with archive.open(part) as stream:
+                yield from iter_docx_part(stream)
 
 
 def extract_from_docx(file_path):
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            archive.getinfo('word/document.xml')
+    except (zipfile.BadZipFile, KeyError):
+        pass
+    else:
+        return iter_docx_paragraphs(file_path)
+
+    # Not a plain OOXML package: let python-docx try, if it is installed.
     try:
         from docx import Document
         doc = Document(file_path)
-        return '\n'.join([para.text for para in doc.paragraphs])
+        return [para.text for para in doc.paragraphs]
     except ImportError:
         print("错误: 需要安装 python-docx 库")
         print("运行: uv pip install python-docx")
         sys.exit(1)
 
 
-def extract_from_pdf(file_path):
+_worker_reader = None
+
+
+def _open_worker_reader(file_path):
+    global _worker_reader
+    import PyPDF2
+    _worker_reader = PyPDF2.PdfReader(open(file_path, 'rb'))
+
+
+def _extract_page_range(start, end):
+    return [_worker_reader.pages[i].extract_text() or '' for i in range(start, end)]
+
+
+def iter_pdf_pages_parallel(file_path, first, end, workers, chunk_size=PAGES_PER_CHUNK):
+    """Extract the texts of pages [first, end) in a process pool and yield them in page order.
+
+    Each worker opens its own reader. At most two chunks per worker are in
+    flight, so finished-but-unconsumed pages stay bounded.
+    """
+    chunks = deque((start, min(start + chunk_size, end)) for start in range(first, end, chunk_size))
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_reader,
+                             initargs=(file_path,)) as pool:
+        while chunks or pending:
+            while chunks and len(pending) < 2 * workers:
+                pending.append(pool.submit(_extract_page_range, *chunks.popleft()))
+            yield from pending.popleft().result()
+
+
+def _import_pypdf2():
     try:
         import PyPDF2
-        import re
-        text = ''
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() + '\n'
-        
-        lines = text.split('\n')
-        processed_lines = []
-        buffer = ''
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            if not stripped:
-                if buffer:
-                    processed_lines.append(buffer)
-                    buffer = ''
-                processed_lines.append('')
-                continue
-            
-            is_title = stripped.startswith('===') or stripped.endswith('===')
-            is_list_item = re.match(r'^[A-Z\u4e00-\u9fa5]+[：:]', stripped)
-            is_special_start = (stripped.startswith('「') or stripped.startswith('『') or 
-                               stripped.startswith('（') or stripped.startswith('【') or
-                               stripped.startswith('《') or re.match(r'^[第【\[\(（]', stripped))
-            
-            if is_title:
-                if buffer:
-                    processed_lines.append(buffer)
-                    buffer = ''
-                processed_lines.append(stripped)
-                continue
-            
-            if buffer:
-                prev_last = buffer[-1]
-                curr_first = stripped[0]
-                
-                should_break = (
-                    prev_last in '。！？；：,.!?;:' or 
-                    is_list_item or
-                    is_special_start or
-                    (re.match(r'^[A-Z\u4e00-\u9fa5]', curr_first) and len(buffer) < 20)
-                )
-                
-                if should_break:
-                    processed_lines.append(buffer)
-                    buffer = stripped
-                else:
-                    buffer += stripped
-            else:
-                buffer = stripped
-        
-        if buffer:
-            processed_lines.append(buffer)
-        
-        return '\n'.join(processed_lines)
     except ImportError:
         print("错误: 需要安装 PyPDF2 库")
         print("运行: uv pip install PyPDF2")
         sys.exit(1)
+    return PyPDF2
+
+
+def pdf_page_count(file_path):
+    PyPDF2 = _import_pypdf2()
+    with open(file_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def iter_pdf_pages(file_path, first, end, workers=1):
+    """Yield the extracted texts of pages [first, end) in order."""
+    if workers > 1:
+        yield from iter_pdf_pages_parallel(file_path, first, end, workers)
+        return
+    PyPDF2 = _import_pypdf2()
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for i in range(first, end):
+            yield reader.pages[i].extract_text() or ''
 
 
 def extract_from_doc(file_path):
     try:
         import textract
-        return textract.process(file_path).decode('utf-8')
+        # antiword hard-wraps .doc text like a PDF page, so reflow it the same way.
+        text = textract.process(file_path).decode('utf-8')
+        return reflow_lines(text.split('\n'))
     except ImportError:
         print("错误: 需要安装 textract 库")
         print("运行: uv pip install textract")
@@ -106,37 +209,395 @@ def extract_from_doc(file_path):
         sys.exit(1)
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Convert DOC, DOCX, PDF to TXT')
-    parser.add_argument('input', help='Input file path (.doc, .docx, .pdf)')
-    parser.add_argument('--output', help='Output file path (optional)')
-    args = parser.parse_args()
+def _load_novel_reader():
+    if NOVEL_READER_DIR not in sys.path:
+        sys.path.insert(0, NOVEL_READER_DIR)
+    try:
+        import read_novel
+    except ImportError:
+        print(f"错误: 未找到 novel-reader 技能 (read_novel.py): {os.path.normpath(NOVEL_READER_DIR)}")
+        sys.exit(1)
+    return read_novel
 
-    input_path = args.input
-    if not os.path.exists(input_path):
-        print(f"错误: 文件不存在: {input_path}")
+
+class _TextOutput:
+    """Newline-joined UTF-8 output with '\n' line endings, optionally indexed as it is written."""
+
+    def __init__(self, f, builder=None, first=True):
+        self.f = f
+        self.builder = builder
+        self.first = first
+
+    def write(self, line):
+        if '\r' in line:
+            line = line.replace('\r\n', '\n').replace('\r', '\n')
+        if not self.first:
+            line = '\n' + line
+        self.f.write(line.encode('utf-8'))
+        if self.builder:
+            self.builder.feed(line)
+        self.first = False
+
+
+def _index_builder(index):
+    if not index:
+        return None, None
+    read_novel = _load_novel_reader()
+    return read_novel, read_novel.IndexBuilder(read_novel.DEFAULT_CHAPTER_PATTERNS)
+
+
+def write_lines(output_path, lines, index=False):
+    """Write lines joined by newlines as they are produced, replacing output_path atomically.
+
+    Line endings are normalised to '\n'. With index=True the novel-reader
+    index sidecar (counts, offset checkpoints, chapters) is built from the
+    same stream and saved next to the output, so it needs no second pass.
+    """
+    read_novel, builder = _index_builder(index)
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            out = _TextOutput(f, builder)
+            for line in lines:
+                out.write(line)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if builder:
+        read_novel.save_index(output_path, builder.finish(output_path))
+
+
+def parse_pages(spec):
+    """Parse a 1-based inclusive page range `A-B`, `A-`, `-B` or `N` into (first, last); None means open."""
+    m = re.fullmatch(r'\s*(\d*)\s*(-?)\s*(\d*)\s*', spec)
+    if not m or not (m.group(1) or m.group(3)):
+        raise argparse.ArgumentTypeError(f'无效的页码范围: {spec}（格式: A-B、A-、-B 或 N）')
+    first = int(m.group(1)) if m.group(1) else None
+    last = int(m.group(3)) if m.group(3) else (None if m.group(2) else first)
+    if (first is not None and first < 1) or (last is not None and last < 1) or (
+            first is not None and last is not None and last < first):
+        raise argparse.ArgumentTypeError(f'无效的页码范围: {spec}')
+    return first, last
+
+
+def _checkpoint_path(output_path):
+    return output_path + CHECKPOINT_SUFFIX
+
+
+def _load_checkpoint(output_path, source):
+    try:
+        with open(_checkpoint_path(output_path), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        part_size = os.path.getsize(output_path + PART_SUFFIX)
+    except (OSError, ValueError):
+        return None
+    if state.get('source') != source or part_size < state['bytes']:
+        return None
+    return state
+
+
+def _save_checkpoint(output_path, state):
+    path = _checkpoint_path(output_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def convert_pdf(input_path, output_path, workers=1, pages=None, resume=False, index=False):
+    """Convert a PDF (or a 1-based (first, last) page range of it) with periodic checkpoints.
+
+    Output grows in `<output>.part`. Every CHECKPOINT_PAGES pages, and when
+    the run fails, `<output>.checkpoint.json` records the next page, the
+    bytes written so far and the reflow state at that page boundary. With
+    resume=True a matching checkpoint is picked up: the part file is cut back
+    to the recorded size and extraction continues from the next page, giving
+    the same output as an uninterrupted run.
+    """
+    page_count = pdf_page_count(input_path)
+    first, last = pages or (None, None)
+    first = (first or 1) - 1
+    end = min(last if last is not None else page_count, page_count)
+    if first >= end:
+        print(f"错误: 页码范围超出文档页数 ({page_count} 页)")
         sys.exit(1)
 
+    st = os.stat(input_path)
+    source = {'path': os.path.abspath(input_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+              'pages': [first, end], 'version': CONVERTER_VERSION}
+    part_path = output_path + PART_SUFFIX
+    state = _load_checkpoint(output_path, source) if resume else None
+    if state is None:
+        state = {'source': source, 'next_page': first, 'bytes': 0, 'buffer': '', 'first': True}
+        mode = 'wb'
+    else:
+        print(f"从第 {state['next_page'] + 1} 页继续转换（共 {page_count} 页）")
+        mode = 'r+b'
+
+    read_novel, builder = _index_builder(index)
+    with open(part_path, mode) as f:
+        f.truncate(state['bytes'])
+        if builder and state['bytes']:
+            # The text written before the checkpoint still has to be indexed.
+            for text, _ in read_novel.iter_pieces(f, block_size=1 << 20):
+                builder.feed(text)
+        f.seek(state['bytes'])
+        out = _TextOutput(f, builder, state['first'])
+        reflow = Reflow(state['buffer'])
+        done = state
+        page = state['next_page']
+        try:
+            for text in iter_pdf_pages(input_path, page, end, workers):
+                for output_line in reflow.feed(text.split('\n')):
+                    out.write(output_line)
+                page += 1
+                done = {'source': source, 'next_page': page, 'bytes': f.tell(),
+                        'buffer': reflow.buffer, 'first': out.first}
+                if (page - first) % CHECKPOINT_PAGES == 0 and page < end:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    _save_checkpoint(output_path, done)
+        except BaseException:
+            f.flush()
+            os.fsync(f.fileno())
+            _save_checkpoint(output_path, done)
+            print(f"转换中断于第 {done['next_page'] + 1} 页，可使用 --resume 继续", file=sys.stderr)
+            raise
+        for output_line in reflow.feed(['']) + reflow.flush():
+            out.write(output_line)
+
+    os.replace(part_path, output_path)
+    if os.path.exists(_checkpoint_path(output_path)):
+        os.remove(_checkpoint_path(output_path))
+    if builder:
+        read_novel.save_index(output_path, builder.finish(output_path))
+    return output_path
+
+
+def convert_file(input_path, output_path, workers=1, index=False, pages=None, resume=False):
     ext = os.path.splitext(input_path)[1].lower()
 
+    if ext == '.pdf':
+        return convert_pdf(input_path, output_path, workers, pages, resume, index)
+    if pages:
+        print("错误: --pages 仅支持 PDF 文件")
+        sys.exit(1)
+
     if ext == '.docx':
-        text = extract_from_docx(input_path)
-    elif ext == '.pdf':
-        text = extract_from_pdf(input_path)
+        lines = extract_from_docx(input_path)
     elif ext == '.doc':
-        text = extract_from_doc(input_path)
+        lines = extract_from_doc(input_path)
     else:
         print(f"错误: 不支持的文件格式: {ext}")
         print("支持格式: .doc, .docx, .pdf")
         sys.exit(1)
 
+    write_lines(output_path, lines, index)
+    return output_path
+
+
+def _convert_job(input_path, output_path, index=False, resume=False):
+    try:
+        return convert_file(input_path, output_path, index=index, resume=resume)
+    except SystemExit as e:
+        # Extractors exit on missing libraries; report it as a per-file failure.
+        raise RuntimeError(f'转换中止 (exit {e.code})') from None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _glob_base(pattern):
+    parts = []
+    for part in pattern.replace(os.sep, '/').split('/'):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+
+def collect_inputs(target):
+    """Return (base_dir, [input paths]) for a directory or a glob pattern."""
+    if os.path.isdir(target):
+        base = target
+        paths = []
+        for root, dirs, files in os.walk(target):
+            dirs.sort()
+            for name in sorted(files):
+                paths.append(os.path.join(root, name))
+    else:
+        base = _glob_base(target)
+        paths = sorted(p for p in glob.glob(target, recursive=True) if os.path.isfile(p))
+    # Skip Office lock files (`~$name.docx`) and anything we cannot convert.
+    paths = [p for p in paths
+             if os.path.splitext(p)[1].lower() in SUPPORTED_EXTENSIONS
+             and not os.path.basename(p).startswith('~$')]
+    return base, paths
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get('files', {}) if isinstance(manifest, dict) else {}
+
+
+def save_manifest(path, entries):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'files': entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def batch_outputs(base, paths, output_dir):
+    """Map each input's manifest key to its output path.
+
+    Outputs are `<stem>.txt`; when several inputs share a stem (`a.doc`,
+    `a.docx`, `a.pdf`), those keep their extension (`a.docx.txt`) so no
+    output overwrites another.
+    """
+    outputs = {}
+    for input_path in paths:
+        key = os.path.relpath(input_path, base).replace(os.sep, '/')
+        outputs[key] = os.path.join(output_dir, key) if output_dir else input_path
+    stems = {}
+    for key, path in outputs.items():
+        stems.setdefault(os.path.normcase(os.path.splitext(path)[0]), []).append(key)
+    for key, path in outputs.items():
+        if len(stems[os.path.normcase(os.path.splitext(path)[0])]) == 1:
+            path = os.path.splitext(path)[0]
+        outputs[key] = path + '.txt'
+    return outputs
+
+
+def plan_batch(base, paths, output_dir, entries, force=False, index=False):
+    """Split inputs into conversion jobs and unchanged files.
+
+    A file is unchanged when its content hash and the converter version match
+    the manifest entry and its output (and index sidecar, if asked for) still
+    exists. The hash is only recomputed when size or mtime differ from the
+    recorded ones.
+    """
+    jobs, unchanged = [], []
+    outputs = batch_outputs(base, paths, output_dir)
+    for input_path in paths:
+        key = os.path.relpath(input_path, base).replace(os.sep, '/')
+        output_path = outputs[key]
+        st = os.stat(input_path)
+        entry = entries.get(key)
+        if entry and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+            digest = entry['sha256']
+        else:
+            digest = file_sha256(input_path)
+        record = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                  'version': CONVERTER_VERSION, 'output': os.path.abspath(output_path)}
+        if (not force and entry and entry.get('sha256') == digest
+                and entry.get('version') == CONVERTER_VERSION
+                and entry.get('output') == record['output'] and os.path.exists(output_path)
+                and not (index and not os.path.exists(output_path + '.index.json'))):
+            entries[key] = record
+            unchanged.append(key)
+        else:
+            jobs.append((key, input_path, output_path, record))
+    return jobs, unchanged
+
+
+def convert_batch(target, output_dir=None, workers=1, force=False, index=False, resume=False):
+    base, paths = collect_inputs(target)
+    if not paths:
+        print(f"错误: 没有找到可转换的文件: {target}")
+        sys.exit(1)
+
+    manifest_path = os.path.join(output_dir or base, MANIFEST_NAME)
+    entries = load_manifest(manifest_path)
+    jobs, unchanged = plan_batch(base, paths, output_dir, entries, force, index)
+    failed = []
+    done = 0
+
+    def finished(key, record, error):
+        nonlocal done
+        if error is None:
+            entries[key] = record
+            print(f"转换成功: {record['output']}")
+        else:
+            entries.pop(key, None)
+            failed.append(key)
+            print(f"转换失败: {key}: {error}", file=sys.stderr)
+        done += 1
+        if done % MANIFEST_SAVE_EVERY == 0:
+            save_manifest(manifest_path, entries)
+
+    for _, _, output_path, _ in jobs:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    try:
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_convert_job, input_path, output_path, index, resume): (key, record)
+                           for key, input_path, output_path, record in jobs}
+                for future in as_completed(futures):
+                    key, record = futures[future]
+                    error = future.exception()
+                    finished(key, record, error)
+        else:
+            for key, input_path, output_path, record in jobs:
+                try:
+                    _convert_job(input_path, output_path, index, resume)
+                    error = None
+                except Exception as e:
+                    error = e
+                finished(key, record, error)
+    finally:
+        save_manifest(manifest_path, entries)
+
+    print(f"批量转换完成: 转换 {len(jobs) - len(failed)} 个, 跳过未变化 {len(unchanged)} 个, 失败 {len(failed)} 个")
+    print(f"清单文件: {manifest_path}")
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert DOC, DOCX, PDF to TXT')
+    parser.add_argument('input', help='Input file, directory or glob pattern (.doc, .docx, .pdf)')
+    parser.add_argument('--output', help='Output file path, or output directory in batch mode (optional)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes for PDF page extraction, or for files in batch mode (default: 1)')
+    parser.add_argument('--force', action='store_true',
+                        help='Batch mode: reconvert files even if the manifest says they are unchanged')
+    parser.add_argument('--index', action='store_true',
+                        help='Also write the novel-reader index sidecar (<output>.index.json) while converting')
+    parser.add_argument('--pages', type=parse_pages, metavar='A-B',
+                        help='PDF only: convert pages A to B (1-based, inclusive; A- or -B for open ranges)')
+    parser.add_argument('--resume', action='store_true',
+                        help='PDF: continue an interrupted conversion from its last checkpoint')
+    args = parser.parse_args()
+
+    input_path = args.input
+    if os.path.isdir(input_path) or (not os.path.exists(input_path) and glob.has_magic(input_path)):
+        if args.pages:
+            print("错误: 批量模式不支持 --pages")
+            sys.exit(1)
+        convert_batch(input_path, args.output, args.workers, args.force, args.index, args.resume)
+        return
+
+    if not os.path.exists(input_path):
+        print(f"错误: 文件不存在: {input_path}")
+        sys.exit(1)
+
     if args.output:
         output_path = args.output
     else:
         output_path = os.path.splitext(input_path)[0] + '.txt'
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(text)
+    convert_file(input_path, output_path, args.workers, args.index, args.pages, args.resume)
 
     print(f"转换成功: {output_path}")
 
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Streaming paragraph reflow for hard-wrapped text.
+
+PDF pages and antiword's .doc output break lines at every visual line end.
+Reflow joins those lines back into paragraphs. Titles (`===...===`), blank
+lines, list items (`名称：`) and lines opening with quotes or brackets stay
+on their own. Any other line is joined to the previous one, unless that line
+ended a sentence or the paragraph so far is shorter than 20 characters and
+the new line starts with a letter or CJK character.
+
+The engine is a two-state machine: either no paragraph is open, or one is
+being joined. Per-character tests go through one precompiled lookup table
+instead of regexes and startswith chains.
+
+Usage:
+    from reflow import Reflow, reflow_lines
+
+Benchmark (synthetic hard-wrapped input, reports MB/s):
+    python3 reflow.py [--chars 10000000] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import time
+
+# Character classes, as bit flags in CHAR_CLASS.
+END = 1       # ends a sentence: never join the next line onto it
+SPECIAL = 2   # opens a line that always starts a new paragraph
+WORD = 4      # A-Z or CJK: starts a new paragraph after a short one
+
+SENTENCE_END_CHARS = '。！？；：,.!?;:'
+SPECIAL_START_CHARS = '「『（【《第[('
+SHORT_PARAGRAPH = 20
+TITLE_MARK = '==='
+LIST_ITEM = re.compile(r'[A-Z\u4e00-\u9fa5]+[：:]')
+DEFAULT_BENCH_CHARS = 10_000_000
+
+
+def _build_char_classes():
+    table = bytearray(0x110000)
+    table[ord('A'):ord('Z') + 1] = bytes([WORD]) * 26
+    table[0x4e00:0x9fa6] = bytes([WORD]) * (0x9fa6 - 0x4e00)
+    for c in SENTENCE_END_CHARS:
+        table[ord(c)] |= END
+    for c in SPECIAL_START_CHARS:
+        table[ord(c)] |= SPECIAL
+    return bytes(table)
+
+
+CHAR_CLASS = _build_char_classes()
+
+
+class Reflow:
+    """Reflow state carried across calls: the paragraph being joined, if any.
+
+    feed() consumes lines and returns the finished output lines; flush()
+    returns the last open paragraph at end of input. `buffer` is the whole
+    state, so a run can be checkpointed between feeds and resumed with
+    Reflow(buffer).
+    """
+
+    def __init__(self, buffer=''):
+        self._parts = [buffer] if buffer else []
+        self._length = len(buffer)
+        self._last = CHAR_CLASS[ord(buffer[-1])] if buffer else 0
+
+    @property
+    def buffer(self):
+        return ''.join(self._parts)
+
+    def run(self, lines):
+        """Yield output lines for the input lines, keeping the trailing paragraph open."""
+        classes = CHAR_CLASS
+        list_item = LIST_ITEM.match
+        parts, length, last = self._parts, self._length, self._last
+        try:
+            for line in lines:
+                s = line.strip()
+                if not s:
+                    if parts:
+                        yield ''.join(parts)
+                        parts, length = [], 0
+                    yield ''
+                    continue
+
+                if s.startswith(TITLE_MARK) or s.endswith(TITLE_MARK):
+                    if parts:
+                        yield ''.join(parts)
+                        parts, length = [], 0
+                    yield s
+                    continue
+
+                if parts:
+                    first = classes[ord(s[0])]
+                    if (last & END or first & SPECIAL
+                            or (first & WORD and length < SHORT_PARAGRAPH)
+                            or (('：' in s or ':' in s) and list_item(s))):
+                        yield ''.join(parts)
+                        parts, length = [s], len(s)
+                    else:
+                        parts.append(s)
+                        length += len(s)
+                else:
+                    parts, length = [s], len(s)
+                last = classes[ord(s[-1])]
+        finally:
+            self._parts, self._length, self._last = parts, length, last
+
+    def feed(self, lines):
+        """Consume an iterable of lines and return the output lines they complete."""
+        return list(self.run(lines))
+
+    def flush(self):
+        """Return the last open paragraph, if any, and reset the state."""
+        out = [''.join(self._parts)] if self._parts else []
+        self._parts, self._length, self._last = [], 0, 0
+        return out
+
+
+def reflow_lines(lines):
+    """Merge hard-wrapped lines back into paragraphs, streaming."""
+    reflow = Reflow()
+    yield from reflow.run(lines)
+    yield from reflow.flush()
+
+
+def synthetic_lines(chars, seed=0):
+    """Deterministic hard-wrapped novel-like text of about `chars` characters, as lines."""
+    rng = random.Random(seed)
+    hanzi = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+    punct = '，，，、。！？；：'
+    lines = []
+    total = 0
+    chapter = 0
+    while total < chars:
+        kind = rng.random()
+        if kind < 0.01:
+            chapter += 1
+            para = [f'第{chapter}章 ' + ''.join(rng.choices(hanzi, k=rng.randint(2, 8)))]
+        elif kind < 0.03:
+            para = ['=== ' + ''.join(rng.choices(hanzi, k=6)) + ' ===']
+        elif kind < 0.08:
+            para = [''.join(rng.choices(hanzi, k=rng.randint(2, 4))) + '：'
+                    + ''.join(rng.choices(hanzi, k=rng.randint(5, 30)))]
+        else:
+            words = []
+            for _ in range(rng.randint(20, 400)):
+                words.append(''.join(rng.choices(hanzi, k=rng.randint(1, 6))))
+                if rng.random() < 0.15:
+                    words.append(rng.choice(punct))
+            text = ''.join(words) + '。'
+            if rng.random() < 0.2:
+                text = '「' + text + '」'
+            width = rng.randint(28, 40)
+            para = [text[i:i + width] for i in range(0, len(text), width)]
+        lines.extend(para)
+        if rng.random() < 0.3:
+            lines.append('')
+        total += sum(len(line) + 1 for line in para)
+    return lines
+
+
+def benchmark(chars=DEFAULT_BENCH_CHARS, repeat=3):
+    lines = synthetic_lines(chars)
+    size = sum(len(line.encode('utf-8')) + 1 for line in lines)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        outputs = 0
+        for _ in reflow_lines(lines):
+            outputs += 1
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        'chars': sum(len(line) + 1 for line in lines),
+        'lines': len(lines),
+        'output_lines': outputs,
+        'mb': size / 1e6,
+        'seconds': best,
+        'mb_per_s': size / 1e6 / best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the reflow engine on synthetic hard-wrapped text')
+    parser.add_argument('--chars', type=int, default=DEFAULT_BENCH_CHARS,
+                        help=f'Synthetic input size in characters (default: {DEFAULT_BENCH_CHARS})')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs; the best is reported (default: 3)')
+    args = parser.parse_args()
+
+    result = benchmark(args.chars, args.repeat)
+    print(f"输入: {result['chars']} 字符, {result['lines']} 行, {result['mb']:.1f} MB")
+    print(f"输出: {result['output_lines']} 行")
+    print(f"耗时: {result['seconds']:.3f} 秒 (最好 {args.repeat} 次)")
+    print(f"吞吐: {result['mb_per_s']:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
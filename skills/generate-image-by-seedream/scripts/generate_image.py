@@ -4,6 +4,7 @@
 # dependencies = [
 #     "requests>=2.31.0",
 #     "pyyaml>=6.0",
+#     "pillow>=10.0.0",
 # ]
 # ///
 """
@@ -20,20 +21,37 @@ Example (equivalent to the curl you provided):
       -i "https://ark-project.tos-cn-beijing.volces.com/doc_image/seedream4_imagesToimage_1.png" \
       -i "https://ark-project.tos-cn-beijing.volces.com/doc_image/seedream4_5_imagesToimage_2.png" \
       --size 2K
+
+Requests go through the shared pooled, rate-limited, retrying Ark client
+(ark_client.py in the generate-video-by-seedance skill next to this one).
 """
 
 import argparse
-import base64
 import os
 import sys
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-try:
-    import yaml
-    HAS_YAML = True
-except ImportError:
-    HAS_YAML = False
-
+from typing import List, Dict, Any
+
+SEEDANCE_SCRIPTS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "generate-video-by-seedance", "scripts"
+)
+if SEEDANCE_SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SEEDANCE_SCRIPTS_DIR)
+
+from ark_client import (  # noqa: E402
+    ArkClient,
+    ArkError,
+    build_image_list,
+    download_result,
+    get_api_key,
+    load_config_from_yaml,
+    output_path_for,
+)
+from image_cache import ImageCache, add_image_args  # noqa: E402
+
+IMAGES_PATH = "/images/generations"
+# Reference images feed 2K-4K outputs, so keep more detail than for video.
+DEFAULT_IMAGE_MAX_SIDE = 4096
 
 VERSION_TO_MODEL = {
     "4.0": "doubao-seedream-4-0-250828",
@@ -51,38 +69,6 @@ ALLOWED_SIZES_BY_VERSION = {
 }
 
 
-def get_api_key(provided_key: Optional[str]) -> Optional[str]:
-    """Get API key from argument first, then environment."""
-    if provided_key:
-        return provided_key
-    return os.environ.get("ARK_API_KEY")
-
-
-def load_config_from_yaml(config_path: str) -> Dict[str, Any]:
-    """Load and parse YAML config file."""
-    if not HAS_YAML:
-        print("Error: pyyaml is required to use --config option. Please install it.", file=sys.stderr)
-        sys.exit(1)
-
-    path = Path(config_path)
-    if not path.is_file():
-        print(f"Error: Config file does not exist or is not a file: {config_path}", file=sys.stderr)
-        sys.exit(1)
-
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        if not isinstance(config, dict):
-            print("Error: Config file must be a YAML mapping/dictionary.", file=sys.stderr)
-            sys.exit(1)
-        # Store config directory for path resolution
-        config["_config_dir"] = path.parent.resolve()
-        return config
-    except Exception as e:
-        print(f"Error loading config file: {e}", file=sys.stderr)
-        sys.exit(1)
-
-
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Generate images using Volcengine Ark Doubao Seedream 5.0",
@@ -114,6 +100,7 @@ def parse_args() -> argparse.Namespace:
             "Can be specified multiple times."
         ),
     )
+    add_image_args(parser, DEFAULT_IMAGE_MAX_SIDE)
     parser.add_argument(
         "--size",
         "-s",
@@ -208,45 +195,6 @@ def merge_config_with_args(config: Dict[str, Any], args: argparse.Namespace) ->
     return merged
 
 
-def build_image_list(images: Optional[List[str]]) -> List[str]:
-    if not images:
-        return []
-
-    resolved: List[str] = []
-
-    for item in images:
-        # Treat HTTP(S) as remote URLs directly.
-        if item.startswith("http://") or item.startswith("https://"):
-            resolved.append(item)
-            continue
-
-        # Otherwise, assume local file path → data URL (Base64).
-        path = Path(item)
-        if not path.is_file():
-            print(f"Error: image path does not exist or is not a file: {item}", file=sys.stderr)
-            sys.exit(1)
-
-        ext = path.suffix.lower().lstrip(".")
-        if ext in ("jpg", "jpeg"):
-            fmt = "jpeg"
-        elif ext in ("png", "webp"):
-            fmt = ext
-        else:
-            # Fallback but warn.
-            fmt = ext or "jpeg"
-            print(
-                f"Warning: unrecognised image extension for '{item}', using '{fmt}' in data URL.",
-                file=sys.stderr,
-            )
-
-        with path.open("rb") as f:
-            b64 = base64.b64encode(f.read()).decode("ascii")
-        data_url = f"data:image/{fmt};base64,{b64}"
-        resolved.append(data_url)
-
-    return resolved
-
-
 def build_payload(
     model: str,
     prompt: str,
@@ -284,11 +232,6 @@ def main() -> None:
         print("  3. Specify in config file", file=sys.stderr)
         sys.exit(1)
 
-    # Import requests lazily so CLI help is fast even without dependency.
-    import requests
-
-    endpoint = "https://ark.cn-beijing.volces.com/api/v3/images/generations"
-
     # Resolve model: explicit --model wins; otherwise map from --version.
     if args.model:
         model_name = args.model
@@ -312,7 +255,8 @@ def main() -> None:
         )
         sys.exit(1)
 
-    images = build_image_list(args.images)
+    image_cache = ImageCache(args.image_max_side, args.image_format)
+    images = build_image_list(args.images, image_cache)
 
     payload = build_payload(
         model=model_name,
@@ -321,36 +265,19 @@ def main() -> None:
         size=args.size,
     )
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-
     print(f"Calling Ark Seedream API with model={model_name}, size={args.size}...")
     if images:
         print(f"Using {len(images)} reference image(s) (URLs and/or local files).")
+    if image_cache.stats["uses"]:
+        print(image_cache.summary())
 
+    client = ArkClient(api_key)
     try:
-        resp = requests.post(endpoint, headers=headers, json=payload, timeout=600)
-    except Exception as e:
+        data = client.post_json(IMAGES_PATH, payload, timeout=600)
+    except ArkError as e:
         print(f"Error calling Ark API: {e}", file=sys.stderr)
         sys.exit(1)
 
-    if resp.status_code != 200:
-        print(f"Ark API returned HTTP {resp.status_code}", file=sys.stderr)
-        try:
-            print(resp.text, file=sys.stderr)
-        except Exception:
-            pass
-        sys.exit(1)
-
-    try:
-        data = resp.json()
-    except Exception as e:
-        print(f"Failed to parse Ark API JSON response: {e}", file=sys.stderr)
-        print(resp.text, file=sys.stderr)
-        sys.exit(1)
-
     # Expected format (from Ark docs):
     # {
     #   "model": "...",
@@ -376,40 +303,11 @@ def main() -> None:
         print(first, file=sys.stderr)
         sys.exit(1)
 
-    print(f"Downloading image from: {img_url}")
-
-    try:
-        download_resp = requests.get(img_url, stream=True, timeout=600)
-    except Exception as e:
-        print(f"Error downloading image from URL: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    if download_resp.status_code != 200:
-        print(
-            f"Error: Failed to download image, HTTP {download_resp.status_code}",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-
     # Ark 默认返回 JPEG。
     # 1) 如果用户没带后缀，就默认补上 .jpg
     # 2) 如果用户没指定目录（纯文件名），默认写入 outputs/ 目录
-    output_path = Path(args.filename)
-    if not output_path.parent or str(output_path.parent) == ".":
-        output_path = Path("outputs") / output_path.name
-    if output_path.suffix == "":
-        output_path = output_path.with_suffix(".jpg")
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    try:
-        with open(output_path, "wb") as f:
-            for chunk in download_resp.iter_content(chunk_size=8192):
-                if not chunk:
-                    continue
-                f.write(chunk)
-    except Exception as e:
-        print(f"Error saving image to file: {e}", file=sys.stderr)
-        sys.exit(1)
+    output_path = output_path_for(args.filename, ".jpg")
+    download_result(client, img_url, output_path, "image")
 
     full_path = output_path.resolve()
     print(f"\nImage saved: {full_path}")
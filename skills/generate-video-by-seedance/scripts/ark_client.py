@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "requests>=2.31.0",
+#     "pyyaml>=6.0",
+# ]
+# ///
+"""
+Shared Volcengine Ark HTTP client for the Seedance and Seedream scripts.
+
+generate_video.py, get_video_task_status.py and
+generate-image-by-seedream/scripts/generate_image.py all talk to Ark through
+ArkClient, which keeps one keep-alive `requests.Session` connection pool per
+process instead of a new TCP+TLS handshake per request, and adds:
+
+  - retries with exponential backoff and jitter on HTTP 429 / 5xx and
+    connection errors (honouring Retry-After). POSTs that create tasks are
+    only retried when the request certainly did not create one (429, 503,
+    connect errors), so a retry never pays for a duplicate task;
+  - a client-side token-bucket rate limiter shared by all threads, so
+    batch runs stay under the account's request rate
+    (ARK_RATE_LIMIT requests per second, default 5; 0 disables it);
+  - per-request timing: set ARK_HTTP_TIMING=1 to log every request to
+    stderr; `summary()` reports totals for a run.
+
+The module also holds the helpers the scripts used to repeat: get_api_key,
+load_config_from_yaml, build_image_list, output_path_for and download_result.
+Downloads are resumable and split across several connections (see
+ranged_download.py); local reference images can go through the
+downscaling data-URL cache in image_cache.py.
+Set ARK_BASE_URL to talk to another Ark region or a local stand-in.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+import ranged_download
+from image_cache import ImageCache, file_data_url
+from ranged_download import DownloadError
+
+API_BASE = os.environ.get("ARK_BASE_URL") or "https://ark.cn-beijing.volces.com/api/v3"
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Responses that guarantee a POST was not processed, so it is safe to resend.
+SAFE_POST_RETRY_STATUSES = (429, 503)
+DOWNLOAD_CONNECTIONS = ranged_download.DEFAULT_CONNECTIONS
+
+
+def get_api_key(provided_key: Optional[str]) -> Optional[str]:
+    """Get API key from argument first, then environment."""
+    if provided_key:
+        return provided_key
+    return os.environ.get("ARK_API_KEY")
+
+
+def load_config_from_yaml(config_path: str) -> Dict[str, Any]:
+    """Load and parse a YAML config file; its directory is kept under `_config_dir`."""
+    if not HAS_YAML:
+        print("Error: pyyaml is required to use --config option. Please install it.", file=sys.stderr)
+        sys.exit(1)
+
+    path = Path(config_path)
+    if not path.is_file():
+        print(f"Error: Config file does not exist or is not a file: {config_path}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        if not isinstance(config, dict):
+            print("Error: Config file must be a YAML mapping/dictionary.", file=sys.stderr)
+            sys.exit(1)
+        # Store config directory for path resolution
+        config["_config_dir"] = path.parent.resolve()
+        return config
+    except Exception as e:
+        print(f"Error loading config file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def build_image_list(images: Optional[List[str]], cache: Optional[ImageCache] = None) -> List[str]:
+    """Pass URLs and data URLs through; encode local files as base64 data URLs (through `cache` if given)."""
+    if not images:
+        return []
+
+    resolved: List[str] = []
+    for item in images:
+        if not item:
+            continue
+        item = item.strip()
+        if not item:
+            continue
+
+        # If already data URL or http(s) URL, pass through.
+        if item.startswith("data:") or item.startswith("http://") or item.startswith("https://"):
+            resolved.append(item)
+            continue
+
+        # Otherwise, assume local file path → data URL (Base64).
+        path = Path(item)
+        if not path.is_file():
+            print(f"Error: image path does not exist or is not a file: {item}", file=sys.stderr)
+            sys.exit(1)
+        resolved.append(cache.data_url(path) if cache else file_data_url(path))
+
+    return resolved
+
+
+def output_path_for(filename: str, default_suffix: str) -> Path:
+    """Put bare filenames under outputs/, add default_suffix when missing, create the directory."""
+    output_path = Path(filename)
+    if not output_path.parent or str(output_path.parent) == ".":
+        output_path = Path("outputs") / output_path.name
+    if output_path.suffix == "":
+        output_path = output_path.with_suffix(default_suffix)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    return output_path
+
+
+def download_result(client: "ArkClient", url: str, output_path: Path, kind: str = "file") -> None:
+    """CLI helper: download a generated result, exiting with an error message on failure."""
+    print(f"Downloading {kind} from: {url}")
+    try:
+        client.download(url, output_path)
+    except (ArkError, OSError) as e:
+        print(f"Error: Failed to download {kind}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+class ArkError(RuntimeError):
+    """An Ark request that failed for good: a non-retryable status or retries exhausted."""
+
+    def __init__(self, message: str, status: Optional[int] = None, body: str = "") -> None:
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; return the time waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: ignoring invalid {name}={value!r}", file=sys.stderr)
+        return default
+
+
+def _retry_after(resp) -> Optional[float]:
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class ArkClient:
+    """Pooled, rate-limited, retrying HTTP client for Ark; one per process, safe to share between threads.
+
+    Paths such as "/contents/generations/tasks" are joined to API_BASE and
+    sent with the API key; absolute URLs (result downloads) are fetched
+    without it and bypass the rate limiter. `pool_size` is the number of
+    keep-alive connections kept per host.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = API_BASE,
+        rate_limit: Optional[float] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        retries: int = DEFAULT_RETRIES,
+    ) -> None:
+        import requests
+
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        if rate_limit is None:
+            rate_limit = _env_float("ARK_RATE_LIMIT", DEFAULT_RATE_LIMIT)
+        self.bucket = TokenBucket(rate_limit)
+        self.log_timing = os.environ.get("ARK_HTTP_TIMING", "") not in ("", "0")
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "seconds": 0.0, "max_seconds": 0.0, "throttled_seconds": 0.0}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ArkClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _record(self, method: str, url: str, status: Any, elapsed: float, throttled: float) -> None:
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["seconds"] += elapsed
+            self.stats["max_seconds"] = max(self.stats["max_seconds"], elapsed)
+            self.stats["throttled_seconds"] += throttled
+        if self.log_timing:
+            print(
+                f"[ark] {method} {urlsplit(url).path} -> {status} in {elapsed * 1000:.0f} ms"
+                + (f" (waited {throttled * 1000:.0f} ms for rate limit)" if throttled else ""),
+                file=sys.stderr,
+            )
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        retries: Optional[int] = None,
+        backoff: float = BACKOFF_BASE,
+        **kwargs: Any,
+    ):
+        """Send a request through the pool, retrying throttling, server and connection errors.
+
+        Returns the final `requests.Response` (which may still carry an error
+        status); raises the last connection error once retries run out.
+        """
+        import requests
+
+        url = self.url(path)
+        api_call = url.startswith(self.base_url)
+        if api_call:
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}",
+                **(kwargs.pop("headers", None) or {}),
+            }
+            kwargs["headers"] = headers
+        idempotent = method.upper() in ("GET", "HEAD")
+        retry_statuses = RETRY_STATUSES if idempotent else SAFE_POST_RETRY_STATUSES
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            throttled = self.bucket.acquire() if api_call else 0.0
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(method, url, type(e).__name__, time.perf_counter() - started, throttled)
+                # A POST that timed out or lost its connection mid-request may have been processed.
+                safe = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not safe or attempt >= retries:
+                    raise
+                error, resp = e, None
+            else:
+                self._record(method, url, resp.status_code, time.perf_counter() - started, throttled)
+                if resp.status_code not in retry_statuses or attempt >= retries:
+                    return resp
+                error = f"HTTP {resp.status_code}"
+                resp.close()
+
+            delay = _retry_after(resp) or min(BACKOFF_MAX, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            with self._stats_lock:
+                self.stats["retries"] += 1
+            print(
+                f"Ark request {method} {urlsplit(url).path} failed ({error}), "
+                f"retry {attempt}/{retries} in {delay:.1f}s...",
+                file=sys.stderr,
+            )
+            time.sleep(delay)
+
+    def request_json(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """Like request(), but raise ArkError unless the response is HTTP 200 with a JSON body."""
+        import requests
+
+        try:
+            resp = self.request(method, path, **kwargs)
+        except requests.RequestException as e:
+            raise ArkError(f"request failed: {e}") from e
+        if resp.status_code != 200:
+            raise ArkError(f"HTTP {resp.status_code}: {resp.text[:500]}", resp.status_code, resp.text)
+        try:
+            return resp.json()
+        except ValueError as e:
+            raise ArkError(f"invalid JSON response: {e}", resp.status_code, resp.text) from e
+
+    def post_json(self, path: str, payload: Dict[str, Any], timeout: float = 60, **kwargs: Any) -> Dict[str, Any]:
+        return self.request_json("POST", path, json=payload, timeout=timeout, **kwargs)
+
+    def get_json(self, path: str, timeout: float = 30, **kwargs: Any) -> Dict[str, Any]:
+        return self.request_json("GET", path, timeout=timeout, **kwargs)
+
+    def download(
+        self, url: str, output_path: Path, timeout: float = 300, connections: int = DOWNLOAD_CONNECTIONS
+    ) -> int:
+        """Fetch a result URL over the pool with resumable ranged requests; return its size in bytes."""
+        import requests
+
+        try:
+            return ranged_download.download(self.request, url, output_path, connections, timeout)
+        except (DownloadError, requests.RequestException) as e:
+            raise ArkError(f"download failed: {e}") from e
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            s = dict(self.stats)
+        if not s["requests"]:
+            return "Ark HTTP: no requests"
+        return (
+            f"Ark HTTP: {s['requests']} request(s), {s['retries']} retried, "
+            f"avg {s['seconds'] / s['requests'] * 1000:.0f} ms, max {s['max_seconds'] * 1000:.0f} ms, "
+            f"{s['throttled_seconds']:.1f}s waiting for the rate limit"
+        )
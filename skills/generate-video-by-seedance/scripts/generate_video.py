@@ -4,6 +4,7 @@
 # dependencies = [
 #     "requests>=2.31.0",
 #     "pyyaml>=6.0",
+#     "pillow>=10.0.0",
 # ]
 # ///
 """
@@ -15,52 +16,39 @@ This is a thin CLI wrapper around:
 
 The request / response semantics roughly mirror the TypeScript example in
 `generate-video.ts` (Seedance), but with a Python + CLI interface suitable
-for OpenClaw skills.
+for OpenClaw skills. Requests go through the pooled, rate-limited,
+retrying client in ark_client.py.
 """
 
 from __future__ import annotations
 
 import argparse
-import base64
-import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Optional, Dict, Any
-try:
-    import yaml
-    HAS_YAML = True
-except ImportError:
-    HAS_YAML = False
 
-
-def get_api_key(provided_key: Optional[str]) -> Optional[str]:
-    """Get API key from argument first, then environment."""
-    if provided_key:
-        return provided_key
-    return os.environ.get("ARK_API_KEY")
-
-
-def load_config_from_yaml(config_path: str) -> Dict[str, Any]:
-    """Load and parse YAML config file."""
-    if not HAS_YAML:
-        print("Error: pyyaml is required to use --config option. Please install it.", file=sys.stderr)
-        sys.exit(1)
-
-    path = Path(config_path)
-    if not path.is_file():
-        print(f"Error: Config file does not exist or is not a file: {config_path}", file=sys.stderr)
-        sys.exit(1)
-
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        if not isinstance(config, dict):
-            print("Error: Config file must be a YAML mapping/dictionary.", file=sys.stderr)
-            sys.exit(1)
-        return config
-    except Exception as e:
-        print(f"Error loading config file: {e}", file=sys.stderr)
-        sys.exit(1)
+from ark_client import (
+    DOWNLOAD_CONNECTIONS,
+    ArkClient,
+    ArkError,
+    build_image_list,
+    download_result,
+    get_api_key,
+    load_config_from_yaml,
+    output_path_for,
+)
+from get_video_task_status import TASKS_PATH, extract_status_and_url
+from image_cache import ImageCache, add_image_args
+from task_ledger import DEFAULT_LEDGER, TaskLedger, job_key
+
+DEFAULT_MODEL = "doubao-seedance-1-5-pro-251215"
+PROMPT_SUFFIX = ".prompt.txt"
+DEFAULT_MAX_IN_FLIGHT = 5
+SUBMIT_RETRIES = 5
+# Seconds; 429 on submit means the in-flight task limit, which frees up slowly.
+SUBMIT_BACKOFF = 15
 
 
 def parse_args() -> argparse.Namespace:
@@ -97,6 +85,7 @@ def parse_args() -> argparse.Namespace:
             "Can be specified multiple times."
         ),
     )
+    add_image_args(parser)
     parser.add_argument(
         "--ratio",
         help='Aspect ratio for the video, e.g. "16:9", "9:16", "1:1", "21:9".',
@@ -118,6 +107,48 @@ def parse_args() -> argparse.Namespace:
             "If not provided, a default Seedance endpoint will be used."
         ),
     )
+    parser.add_argument(
+        "--batch",
+        help=(
+            "Batch mode: a directory of *.prompt.txt clip prompts (searched recursively), "
+            "or a YAML/JSON manifest with a `jobs` list. --image/--ratio/--duration/--model "
+            "become defaults for every job."
+        ),
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help=(
+            "Batch mode: maximum tasks generating at once, i.e. the provider's "
+            f"in-flight task limit (default: {DEFAULT_MAX_IN_FLIGHT})."
+        ),
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=10,
+        help="Batch mode: polling interval in seconds (default: 10).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=1800,
+        help="Batch mode: maximum wait per task in seconds (default: 1800).",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=DEFAULT_LEDGER,
+        help=(
+            "Task ledger database. A job already recorded there (same payload and output file) "
+            f"attaches to its task instead of submitting again (default: {DEFAULT_LEDGER})."
+        ),
+    )
+    parser.add_argument(
+        "--resubmit",
+        action="store_true",
+        help="Submit a new task even if the ledger already has one for this job.",
+    )
     return parser.parse_args()
 
 
@@ -167,49 +198,6 @@ def merge_config_with_args(config: Dict[str, Any], args: argparse.Namespace) ->
     return merged
 
 
-def build_image_list(images: Optional[List[str]]) -> List[str]:
-    if not images:
-        return []
-
-    resolved: List[str] = []
-    for item in images:
-        if not item:
-            continue
-        item = item.strip()
-        if not item:
-            continue
-
-        # If already data URL or http(s) URL, pass through.
-        if item.startswith("data:") or item.startswith("http://") or item.startswith("https://"):
-            resolved.append(item)
-            continue
-
-        # Otherwise, assume local file path → data URL (Base64).
-        path = Path(item)
-        if not path.is_file():
-            print(f"Error: image path does not exist or is not a file: {item}", file=sys.stderr)
-            sys.exit(1)
-
-        ext = path.suffix.lower().lstrip(".")
-        if ext in ("jpg", "jpeg"):
-            fmt = "jpeg"
-        elif ext in ("png", "webp"):
-            fmt = ext
-        else:
-            fmt = ext or "jpeg"
-            print(
-                f"Warning: unrecognised image extension for '{item}', using '{fmt}' in data URL.",
-                file=sys.stderr,
-            )
-
-        with path.open("rb") as f:
-            b64 = base64.b64encode(f.read()).decode("ascii")
-        data_url = f"data:image/{fmt};base64,{b64}"
-        resolved.append(data_url)
-
-    return resolved
-
-
 def build_content(prompt: Optional[str], images: List[str], model_name: str) -> List[dict]:
     content: List[dict] = []
 
@@ -260,52 +248,237 @@ def build_content(prompt: Optional[str], images: List[str], model_name: str) ->
 
 
 def resolve_output_path(filename: str) -> Path:
-    output_path = Path(filename)
-    if not output_path.parent or str(output_path.parent) == ".":
-        output_path = Path("outputs") / output_path.name
-    if output_path.suffix == "":
-        # Default to mp4 for video.
-        output_path = output_path.with_suffix(".mp4")
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    return output_path
-
+    # Default to mp4 for video.
+    return output_path_for(filename, ".mp4")
+
+
+def clip_name(job: Dict[str, Any]) -> str:
+    """Short label for log lines, e.g. EP001/视频_Clip001."""
+    path = Path(job["filename"])
+    return f"{path.parent.name}/{path.stem}" if path.parent.name else path.stem
+
+
+def _resolve_local(item: str, base: Path) -> str:
+    if item.startswith(("data:", "http://", "https://")) or Path(item).is_absolute():
+        return item
+    return str(base / item)
+
+
+def load_batch_jobs(source: str, defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand a clip directory or manifest into job dicts.
+
+    A directory yields one job per `*.prompt.txt`, saved next to it as
+    `<name>.mp4` (e.g. 视频_Clip001.prompt.txt -> 视频_Clip001.mp4). A
+    manifest is a YAML/JSON mapping with optional `defaults` and a `jobs`
+    list; each job takes the single-run config keys (prompt or prompt_file,
+    filename, images, ratio, duration, model). Relative paths in a
+    manifest are resolved against the manifest's directory.
+    """
+    path = Path(source)
+    jobs: List[Dict[str, Any]] = []
+
+    if path.is_dir():
+        for prompt_file in sorted(path.rglob(f"*{PROMPT_SUFFIX}")):
+            name = prompt_file.name[: -len(PROMPT_SUFFIX)]
+            job = dict(defaults)
+            job["prompt"] = prompt_file.read_text(encoding="utf-8")
+            job["filename"] = str(prompt_file.with_name(name + ".mp4"))
+            jobs.append(job)
+        return jobs
+
+    manifest = load_config_from_yaml(source)
+    base = path.parent
+    shared = dict(defaults)
+    shared.update({k: v for k, v in (manifest.get("defaults") or {}).items() if v is not None})
+    entries = manifest.get("jobs")
+    if not isinstance(entries, list):
+        print("Error: batch manifest must contain a `jobs` list.", file=sys.stderr)
+        sys.exit(1)
 
-def download_video(url: str, output_path: Path) -> None:
-    import requests
+    for i, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            print(f"Error: batch job #{i} must be a mapping.", file=sys.stderr)
+            sys.exit(1)
+        job = dict(shared)
+        job.update({k: v for k, v in entry.items() if v is not None})
+        if "prompt_file" in job:
+            job["prompt"] = Path(_resolve_local(str(job.pop("prompt_file")), base)).read_text(encoding="utf-8")
+        images = job.get("images")
+        if images is not None:
+            images = images if isinstance(images, list) else [images]
+            job["images"] = [_resolve_local(str(img), base) for img in images]
+        if not job.get("filename"):
+            print(f"Error: batch job #{i} has no filename.", file=sys.stderr)
+            sys.exit(1)
+        job["filename"] = _resolve_local(str(job["filename"]), base)
+        jobs.append(job)
+    return jobs
 
-    print(f"Downloading video from: {url}")
 
+def submit_task(client: ArkClient, payload: dict) -> dict:
+    """POST a task, waiting and retrying while the provider reports too many in flight (HTTP 429)."""
     try:
-        resp = requests.get(url, stream=True, timeout=300)
-    except Exception as e:
-        print(f"Error downloading video from URL: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    if resp.status_code != 200:
-        print(
-            f"Error: Failed to download video, HTTP {resp.status_code}",
-            file=sys.stderr,
-        )
+        return client.post_json(TASKS_PATH, payload, retries=SUBMIT_RETRIES, backoff=SUBMIT_BACKOFF)
+    except ArkError as e:
+        raise RuntimeError(f"Ark video API {e}") from None
+
+
+def poll_task(
+    client: ArkClient, task_id: str, name: str, interval: int, timeout: int, ledger: Optional[TaskLedger] = None
+) -> str:
+    """Poll until the task succeeds and return its video_url. Transient poll errors are retried."""
+    start = time.time()
+    last_status: Optional[str] = None
+    while time.time() - start <= timeout:
         try:
-            print(resp.text, file=sys.stderr)
-        except Exception:
-            pass
+            data = client.get_json(f"{TASKS_PATH}/{task_id}")
+        except Exception as e:
+            print(f"[{name}] Polling task {task_id} failed ({e}), will retry.", file=sys.stderr)
+            time.sleep(interval)
+            continue
+
+        status, video_url = extract_status_and_url(data)
+        if status != last_status:
+            print(f"[{name}] Task {task_id} status: {status}")
+            last_status = status
+            if ledger:
+                ledger.update(task_id, status, video_url=video_url)
+        if status in ("succeeded", "success", "completed"):
+            if not video_url:
+                raise RuntimeError("task succeeded but no video_url found in response")
+            return video_url
+        if status in ("failed", "error"):
+            if ledger:
+                ledger.update(task_id, "failed", error=str(data)[:2000])
+            raise RuntimeError(f"task failed: {str(data)[:500]}")
+        time.sleep(interval)
+    raise RuntimeError(f"timeout after {timeout}s, last status: {last_status or 'unknown'}")
+
+
+def run_clip(
+    job: Dict[str, Any], client: ArkClient, interval: int, timeout: int,
+    ledger: Optional[TaskLedger] = None, resubmit: bool = False, image_cache: Optional[ImageCache] = None,
+) -> Path:
+    """Submit one clip, wait for it and download it. Occupies one in-flight slot throughout.
+
+    With a ledger, a clip already submitted earlier attaches to its recorded task.
+    """
+    name = clip_name(job)
+    model_name = job.get("model") or DEFAULT_MODEL
+    images = build_image_list(job.get("images"), image_cache)
+    content = build_content(job.get("prompt"), images, model_name)
+    if not content:
+        raise RuntimeError("prompt and reference images cannot both be empty")
+
+    payload: dict = {
+        "model": model_name,
+        "content": content,
+        "ratio": str(job.get("ratio") or "16:9"),
+        "duration": int(job.get("duration") or 5),
+        "watermark": False,
+    }
+
+    output_path = resolve_output_path(str(job["filename"]))
+    key = job_key(payload, output_path)
+    entry = ledger.attachable(key) if ledger and not resubmit else None
+    if entry:
+        task_id = entry["task_id"]
+        print(f"[{name}] Attaching to existing task {task_id} (status: {entry['status']})")
+        video_url = None
+    else:
+        data = submit_task(client, payload)
+        task_id = data.get("id") or data.get("task_id")
+        _, video_url = extract_status_and_url(data)
+        if task_id and ledger:
+            ledger.record_submission(key, payload, task_id, model_name, output_path)
+    if not video_url:
+        if not task_id:
+            raise RuntimeError(f"no task_id or video_url in response: {str(data)[:500]}")
+        print(f"[{name}] TASK_ID: {task_id}")
+        video_url = poll_task(client, task_id, name, interval, timeout, ledger)
+
+    print(f"[{name}] Downloading video from: {video_url}")
+    client.download(video_url, output_path)
+    if task_id and ledger:
+        ledger.update(task_id, "downloaded", output_path=output_path)
+    return output_path.resolve()
+
+
+def run_batch(args: argparse.Namespace, api_key: str) -> None:
+    """Run every job with at most --max-in-flight tasks generating at once.
+
+    Each slot carries a clip from submission to download, so a new task is
+    submitted as soon as an earlier one finishes and the provider's
+    in-flight limit is never exceeded. All slots share one pooled ArkClient.
+    """
+    defaults = {
+        "images": args.images,
+        "ratio": args.ratio,
+        "duration": args.duration,
+        "model": args.model,
+    }
+    jobs = load_batch_jobs(args.batch, {k: v for k, v in defaults.items() if v})
+    if not jobs:
+        print(f"Error: no clip jobs found in {args.batch}", file=sys.stderr)
         sys.exit(1)
 
-    try:
-        with output_path.open("wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if not chunk:
-                    continue
-                f.write(chunk)
-    except Exception as e:
-        print(f"Error saving video to file: {e}", file=sys.stderr)
+    pending = [job for job in jobs if not resolve_output_path(str(job["filename"])).exists()]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} clip(s) whose output already exists.")
+    print(f"Submitting {len(pending)} clip(s), at most {args.max_in_flight} in flight...")
+
+    failed: List[str] = []
+    ledger = TaskLedger(args.ledger)
+    # Each slot polls over one connection and downloads over DOWNLOAD_CONNECTIONS.
+    client = ArkClient(api_key, pool_size=max(1, args.max_in_flight) * DOWNLOAD_CONNECTIONS)
+    # Shared character / scene sheets are encoded once for the whole batch.
+    image_cache = ImageCache(args.image_max_side, args.image_format)
+
+    def run(job: Dict[str, Any]) -> Path:
+        try:
+            return run_clip(job, client, args.interval, args.timeout, ledger, args.resubmit, image_cache)
+        except SystemExit as e:
+            # Shared helpers exit on bad input or failed downloads; fail just this clip.
+            raise RuntimeError(f"aborted (exit {e.code})") from None
+
+    with ThreadPoolExecutor(max_workers=max(1, args.max_in_flight)) as pool:
+        futures = {pool.submit(run, job): job for job in pending}
+        for future in as_completed(futures):
+            name = clip_name(futures[future])
+            try:
+                full_path = future.result()
+            except Exception as e:
+                failed.append(name)
+                print(f"[{name}] Error: {e}", file=sys.stderr)
+                continue
+            print(f"[{name}] Video saved: {full_path}")
+            print(f"MEDIA: {full_path}")
+
+    client.close()
+    print(f"\nBatch finished: {len(pending) - len(failed)} succeeded, {len(failed)} failed, {skipped} skipped.")
+    print(client.summary())
+    if image_cache.stats["uses"]:
+        print(image_cache.summary())
+    if failed:
+        print("Failed clips: " + ", ".join(failed), file=sys.stderr)
         sys.exit(1)
 
 
 def main() -> None:
     args = parse_args()
 
+    if args.batch:
+        if args.config:
+            print("Error: --config cannot be combined with --batch; put shared settings in the manifest's `defaults`.", file=sys.stderr)
+            sys.exit(1)
+        api_key = get_api_key(args.api_key)
+        if not api_key:
+            print("Error: No Ark API key provided (use --api-key or ARK_API_KEY).", file=sys.stderr)
+            sys.exit(1)
+        run_batch(args, api_key)
+        return
+
     # Load config from YAML if provided
     config = {}
     if args.config:
@@ -327,15 +500,11 @@ def main() -> None:
         print("Provide at least one of: --prompt or -i/--image.", file=sys.stderr)
         sys.exit(1)
 
-    # Import requests lazily so CLI help is fast even without dependency.
-    import requests
-
-    endpoint = "https://ark.cn-beijing.volces.com/api/v3/contents/generations/tasks"
-
     # Resolve model: explicit --model wins; otherwise use Seedance 1.5 pro by default.
-    model_name = args.model or "doubao-seedance-1-5-pro-251215"
+    model_name = args.model or DEFAULT_MODEL
 
-    images = build_image_list(args.images)
+    image_cache = ImageCache(args.image_max_side, args.image_format)
+    images = build_image_list(args.images, image_cache)
     content = build_content(args.prompt, images, model_name)
 
     if not content:
@@ -351,36 +520,38 @@ def main() -> None:
         # generate_audio can be added later if needed / supported.
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
+    output_path = resolve_output_path(args.filename)
+    ledger = TaskLedger(args.ledger)
+    key = job_key(payload, output_path)
+    entry = None if args.resubmit else ledger.attachable(key)
+    if entry:
+        # The same job was submitted before: reuse its task instead of paying for a new one.
+        if entry["status"] == "downloaded":
+            full_path = Path(entry["output_path"])
+            print(f"Already generated by task {entry['task_id']} (use --resubmit to generate again).")
+            print(f"\nVideo saved: {full_path}")
+            print(f"MEDIA: {full_path}")
+            return
+        print(
+            f"Attaching to existing task {entry['task_id']} (status: {entry['status']}); "
+            "not submitting again (use --resubmit to force a new task)."
+        )
+        print(f"TASK_ID: {entry['task_id']}")
+        return
 
     print(f"Calling Ark Seedance video API with model={model_name}, ratio={args.ratio}, duration={args.duration}s...")
     if images:
         print(f"Using {len(images)} reference image(s) (URLs and/or local files).")
+    if image_cache.stats["uses"]:
+        print(image_cache.summary())
 
+    client = ArkClient(api_key)
     try:
-        resp = requests.post(endpoint, headers=headers, json=payload, timeout=60)
-    except Exception as e:
+        data = client.post_json(TASKS_PATH, payload)
+    except ArkError as e:
         print(f"Error calling Ark video API: {e}", file=sys.stderr)
         sys.exit(1)
 
-    if resp.status_code != 200:
-        print(f"Ark video API returned HTTP {resp.status_code}", file=sys.stderr)
-        try:
-            print(resp.text, file=sys.stderr)
-        except Exception:
-            pass
-        sys.exit(1)
-
-    try:
-        data = resp.json()
-    except Exception as e:
-        print(f"Failed to parse Ark video API JSON response: {e}", file=sys.stderr)
-        print(resp.text, file=sys.stderr)
-        sys.exit(1)
-
     # Seedance task API is typically async. We try to be generous in what we accept:
     # - Prefer id / task_id as the task identifier.
     # - Try several locations for video_url-like fields.
@@ -392,6 +563,8 @@ def main() -> None:
     )
 
     if task_id:
+        # Record the task before anything else can fail, so a crash never loses it.
+        ledger.record_submission(key, payload, task_id, model_name, output_path)
         print(f"Seedance video task created, task_id={task_id}")
 
     # Some deployments may return data: [...] wrapping task info or URLs.
@@ -424,8 +597,9 @@ def main() -> None:
             print(f"TASK_ID: {task_id}")
         return
 
-    output_path = resolve_output_path(args.filename)
-    download_video(video_url, output_path)
+    download_result(client, video_url, output_path, "video")
+    if task_id:
+        ledger.update(task_id, "downloaded", output_path=output_path)
 
     full_path = output_path.resolve()
     print(f"\nVideo saved: {full_path}")
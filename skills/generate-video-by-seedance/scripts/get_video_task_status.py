@@ -12,22 +12,33 @@ download the resulting video when it is ready.
 Endpoint:
 
   GET https://ark.cn-beijing.volces.com/api/v3/contents/generations/tasks/{task_id}
+
+Given several task IDs (or --tasks-file), all tasks are tracked from one
+asyncio loop over a shared keep-alive connection pool, each with its own
+exponential backoff, and every video is downloaded as soon as its task
+succeeds. Requests go through the shared pooled client in ark_client.py.
 """
 
 from __future__ import annotations
 
 import argparse
-import os
+import asyncio
+import random
 import sys
 import time
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
+from ark_client import DOWNLOAD_CONNECTIONS, ArkClient, ArkError, download_result, get_api_key
+from task_ledger import DEFAULT_LEDGER, TaskLedger
 
-def get_api_key(provided_key: Optional[str]) -> Optional[str]:
-    if provided_key:
-        return provided_key
-    return os.environ.get("ARK_API_KEY")
+TASKS_PATH = "/contents/generations/tasks"
+SUCCEEDED = ("succeeded", "success", "completed")
+FAILED = ("failed", "error")
+DEFAULT_MAX_INTERVAL = 60
+BACKOFF_FACTOR = 1.5
+DEFAULT_CONCURRENCY = 8
+MAX_PARALLEL_DOWNLOADS = 4
 
 
 def parse_args() -> argparse.Namespace:
@@ -35,34 +46,66 @@ def parse_args() -> argparse.Namespace:
         description="Poll Seedance video task status and download the video when ready.",
     )
     parser.add_argument(
-        "task_id",
-        help="Seedance video task ID, e.g. cgt-20260226184301-4h8v6.",
+        "task_ids",
+        nargs="*",
+        metavar="task_id",
+        help="Seedance video task ID(s), e.g. cgt-20260226184301-4h8v6.",
+    )
+    parser.add_argument(
+        "--tasks-file",
+        help=(
+            "File with one task per line: `<task_id> [filename]`. Lines such as "
+            "`TASK_ID: <id>` from generate_video.py output also work; # starts a comment."
+        ),
     )
     parser.add_argument(
         "--filename",
         "-f",
         help=(
             "Output filename (e.g. 完成视频.mp4). "
-            "If not given, defaults to <task_id>.mp4 under outputs/."
+            "If not given, defaults to <task_id>.mp4 under outputs/. Single task only."
         ),
     )
     parser.add_argument(
         "--interval",
         type=int,
         default=10,
-        help="Polling interval in seconds (default: 10).",
+        help=(
+            "Polling interval in seconds (default: 10). With several tasks this is "
+            "the initial interval, backed off per task up to --max-interval."
+        ),
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=int,
+        default=DEFAULT_MAX_INTERVAL,
+        help=f"Several tasks: longest backoff between polls of one task (default: {DEFAULT_MAX_INTERVAL}).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Several tasks: maximum simultaneous status requests (default: {DEFAULT_CONCURRENCY}).",
     )
     parser.add_argument(
         "--timeout",
         type=int,
         default=600,
-        help="Maximum wait time in seconds before giving up (default: 600).",
+        help="Maximum wait time in seconds before giving up, per task (default: 600).",
     )
     parser.add_argument(
         "--api-key",
         "-k",
         help="Ark API key (overrides ARK_API_KEY env var).",
     )
+    parser.add_argument(
+        "--ledger",
+        default=DEFAULT_LEDGER,
+        help=(
+            "Task ledger database; statuses of recorded tasks are updated there and their "
+            f"recorded output paths are used by default (default: {DEFAULT_LEDGER})."
+        ),
+    )
     return parser.parse_args()
 
 
@@ -80,62 +123,11 @@ def resolve_output_path(task_id: str, filename: Optional[str]) -> Path:
     return path
 
 
-def download_video(url: str, output_path: Path) -> None:
-    import requests
-
-    print(f"Downloading video from: {url}")
-
-    try:
-        resp = requests.get(url, stream=True, timeout=300)
-    except Exception as e:
-        print(f"Error downloading video from URL: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    if resp.status_code != 200:
-        print(
-            f"Error: Failed to download video, HTTP {resp.status_code}",
-            file=sys.stderr,
-        )
-        try:
-            print(resp.text, file=sys.stderr)
-        except Exception:
-            pass
-        sys.exit(1)
-
-    try:
-        with output_path.open("wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if not chunk:
-                    continue
-                f.write(chunk)
-    except Exception as e:
-        print(f"Error saving video to file: {e}", file=sys.stderr)
-        sys.exit(1)
-
-
-def fetch_task(task_id: str, api_key: str) -> dict:
-    import requests
-
-    endpoint = f"https://ark.cn-beijing.volces.com/api/v3/contents/generations/tasks/{task_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-
-    resp = requests.get(endpoint, headers=headers, timeout=30)
-    if resp.status_code != 200:
-        print(f"Ark video task API returned HTTP {resp.status_code}", file=sys.stderr)
-        try:
-            print(resp.text, file=sys.stderr)
-        except Exception:
-            pass
-        sys.exit(1)
-
+def fetch_task(client: ArkClient, task_id: str) -> dict:
     try:
-        return resp.json()
-    except Exception as e:
-        print(f"Failed to parse Ark video task JSON response: {e}", file=sys.stderr)
-        print(resp.text, file=sys.stderr)
+        return client.get_json(f"{TASKS_PATH}/{task_id}")
+    except ArkError as e:
+        print(f"Ark video task API returned {e}", file=sys.stderr)
         sys.exit(1)
 
 
@@ -167,6 +159,131 @@ def extract_status_and_url(data: dict) -> tuple[str, Optional[str]]:
     return status, video_url
 
 
+def read_tasks_file(path: str) -> List[Tuple[str, Optional[str]]]:
+    tasks: List[Tuple[str, Optional[str]]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if "TASK_ID:" in line:
+                line = line.split("TASK_ID:", 1)[1].strip()
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            tasks.append((parts[0], parts[1].strip() if len(parts) > 1 else None))
+    return tasks
+
+
+def next_delay(delay: float, max_interval: float) -> float:
+    """Grow the per-task delay exponentially, capped at max_interval."""
+    return min(delay * BACKOFF_FACTOR, max_interval)
+
+
+def jittered(delay: float) -> float:
+    # Equal jitter: keeps at least half the delay, spreads polls of tasks
+    # submitted together so they do not hit the API in lockstep.
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def track_task(
+    task_id: str,
+    output_path: Path,
+    client: ArkClient,
+    args: argparse.Namespace,
+    request_slots: asyncio.Semaphore,
+    download_slots: asyncio.Semaphore,
+    ledger: Optional[TaskLedger] = None,
+) -> Path:
+    """Poll one task with backoff until it finishes, then download its video.
+
+    Status changes, the download and task failure are recorded in `ledger` when given.
+    """
+    path = f"{TASKS_PATH}/{task_id}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.timeout
+    delay = float(args.interval)
+    last_status: Optional[str] = None
+
+    while True:
+        try:
+            async with request_slots:
+                # The per-task backoff below handles retries, so the client must not.
+                resp = await asyncio.to_thread(client.request, "GET", path, retries=0, timeout=30)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                raise ConnectionError(f"HTTP {resp.status_code}")
+            if resp.status_code != 200:
+                raise RuntimeError(f"Ark video task API returned HTTP {resp.status_code}: {resp.text[:500]}")
+            data = resp.json()
+        except (ConnectionError, OSError, ValueError) as e:
+            # Throttling, server errors and dropped connections: back off and retry.
+            print(f"[{task_id}] poll failed ({e}), retrying", file=sys.stderr)
+            data = None
+
+        if data is not None:
+            status, video_url = extract_status_and_url(data)
+            if status in SUCCEEDED:
+                if not video_url:
+                    raise RuntimeError("task succeeded but no video_url found in response")
+                print(f"[{task_id}] status: {status}, downloading")
+                if ledger:
+                    ledger.update(task_id, status, video_url=video_url)
+                async with download_slots:
+                    await asyncio.to_thread(client.download, video_url, output_path)
+                if ledger:
+                    ledger.update(task_id, "downloaded", output_path=output_path)
+                return output_path.resolve()
+            if status in FAILED:
+                if ledger:
+                    ledger.update(task_id, "failed", error=str(data)[:2000])
+                raise RuntimeError(f"task failed: {str(data)[:500]}")
+            if status != last_status:
+                print(f"[{task_id}] status: {status}")
+                if ledger:
+                    ledger.update(task_id, status)
+                # A state change (e.g. queued -> running) makes completion nearer.
+                if last_status is not None:
+                    delay = float(args.interval)
+                last_status = status
+
+        wait = jittered(delay)
+        if loop.time() + wait > deadline:
+            raise TimeoutError(f"timeout reached ({args.timeout}s), last known status: {last_status or 'unknown'}")
+        await asyncio.sleep(wait)
+        delay = next_delay(delay, args.max_interval)
+
+
+async def track_tasks(
+    tasks: List[Tuple[str, Path]], client: ArkClient, args: argparse.Namespace, ledger: Optional[TaskLedger] = None
+) -> int:
+    """Track all tasks concurrently from one event loop; return the number that failed.
+
+    `client` should come from pooled_client(), sized for --concurrency and the downloads.
+    """
+    request_slots = asyncio.Semaphore(max(1, args.concurrency))
+    download_slots = asyncio.Semaphore(MAX_PARALLEL_DOWNLOADS)
+
+    async def run(task_id: str, output_path: Path) -> bool:
+        try:
+            full_path = await track_task(
+                task_id, output_path, client, args, request_slots, download_slots, ledger
+            )
+        except Exception as e:
+            print(f"[{task_id}] Error: {e}", file=sys.stderr)
+            if ledger:
+                ledger.note_error(task_id, str(e))
+            return False
+        print(f"[{task_id}] Video saved: {full_path}")
+        print(f"MEDIA: {full_path}")
+        return True
+
+    results = await asyncio.gather(*(run(task_id, path) for task_id, path in tasks))
+    return results.count(False)
+
+
+def pooled_client(api_key: str, args: argparse.Namespace) -> ArkClient:
+    # Pools are per host: status requests go to Ark, downloads to the result storage.
+    return ArkClient(api_key, pool_size=max(args.concurrency, MAX_PARALLEL_DOWNLOADS * DOWNLOAD_CONNECTIONS, 1))
+
+
 def main() -> None:
     args = parse_args()
 
@@ -178,15 +295,47 @@ def main() -> None:
         print("  2. Set ARK_API_KEY environment variable", file=sys.stderr)
         sys.exit(1)
 
-    task_id = args.task_id.strip()
-    if not task_id:
+    tasks = [(task_id.strip(), None) for task_id in args.task_ids if task_id.strip()]
+    if args.tasks_file:
+        try:
+            tasks += read_tasks_file(args.tasks_file)
+        except OSError as e:
+            print(f"Error reading tasks file: {e}", file=sys.stderr)
+            sys.exit(1)
+    if not tasks:
         print("Error: task_id cannot be empty.", file=sys.stderr)
         sys.exit(1)
 
-    output_path = resolve_output_path(task_id, args.filename)
+    ledger = TaskLedger(args.ledger)
+
+    def recorded_output(task_id: str) -> Optional[str]:
+        entry = ledger.find_task(task_id)
+        return entry["output_path"] if entry else None
+
+    if len(tasks) > 1:
+        if args.filename:
+            print("Error: --filename only applies to a single task; give filenames in --tasks-file.", file=sys.stderr)
+            sys.exit(1)
+        resolved = [
+            (task_id, resolve_output_path(task_id, filename or recorded_output(task_id)))
+            for task_id, filename in tasks
+        ]
+        print(f"Tracking {len(resolved)} tasks...")
+        with pooled_client(api_key, args) as client:
+            failed = asyncio.run(track_tasks(resolved, client, args, ledger))
+        print(f"\nDone: {len(resolved) - failed} saved, {failed} failed.")
+        print(client.summary())
+        if failed:
+            sys.exit(1)
+        return
+
+    task_id, filename = tasks[0]
+    output_path = resolve_output_path(task_id, args.filename or filename or recorded_output(task_id))
 
+    client = ArkClient(api_key)
     start = time.time()
     last_status: Optional[str] = None
+    last_recorded: Optional[str] = None
 
     while True:
         elapsed = time.time() - start
@@ -197,24 +346,29 @@ def main() -> None:
             )
             sys.exit(1)
 
-        data = fetch_task(task_id, api_key)
+        data = fetch_task(client, task_id)
         status, video_url = extract_status_and_url(data)
         last_status = status
 
         print(f"Task {task_id} status: {status}")
+        if status != last_recorded:
+            ledger.update(task_id, status, video_url=video_url)
+            last_recorded = status
 
-        if status in ("succeeded", "success", "completed"):
+        if status in SUCCEEDED:
             if not video_url:
                 print("Task succeeded but no video_url found in response.", file=sys.stderr)
                 sys.exit(1)
 
-            download_video(video_url, output_path)
+            download_result(client, video_url, output_path, "video")
+            ledger.update(task_id, "downloaded", output_path=output_path)
             full_path = output_path.resolve()
             print(f"\nVideo saved: {full_path}")
             print(f"MEDIA: {full_path}")
             return
 
-        if status in ("failed", "error"):
+        if status in FAILED:
+            ledger.update(task_id, "failed", error=str(data)[:2000])
             print("Task failed.", file=sys.stderr)
             # Print truncated raw data for debugging.
             try:
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "pillow>=10.0.0",
+# ]
+# ///
+"""
+Content-addressed cache of reference-image data URLs.
+
+Ark takes local reference images inline as base64 data URLs. The same
+character and scene sheets (角色/*.png, 场景/*.png) go into every clip of a
+batch, often as 4K PNGs that make each request body tens of MB. ImageCache
+turns each file into its data URL once:
+
+  - images longer than `max_side` pixels are downscaled and saved in their
+    own format (PNG losslessly, palette PNGs still paletted; JPEG and WebP
+    at `quality`); everything else is sent untouched. Lossy recompression
+    is opt-in: with `fmt` "jpeg" or "webp", resized images and files over
+    RECOMPRESS_OVER are re-encoded at `quality`. Either way the original
+    is kept whenever it is already smaller. Re-encoding needs Pillow;
+    without it files are sent as they are;
+  - results are keyed by the file's SHA-256 and the encoding settings.
+    They are kept in memory for the run and under `cache_dir` on disk, so
+    later jobs and later runs skip both the re-encode and the re-read;
+  - summary() reports how many bytes the requests did not have to carry.
+
+Usage:
+    uv run image_cache.py <image>... [--image-max-side 2048] [--image-format keep]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import io
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.environ.get("ARK_IMAGE_CACHE") or str(Path("outputs") / ".ark_image_cache")
+DEFAULT_MAX_SIDE = 2048
+DEFAULT_QUALITY = 90
+FORMATS = ("keep", "jpeg", "webp", "original")
+LOSSY_FORMATS = ("jpeg", "webp")
+# With a lossy format, files below this size are only re-encoded when they need downscaling.
+RECOMPRESS_OVER = 512 * 1024
+CACHE_VERSION = 4
+
+
+def _image_type(path: Path) -> str:
+    ext = path.suffix.lower().lstrip(".")
+    if ext in ("jpg", "jpeg"):
+        return "jpeg"
+    if ext in ("png", "webp"):
+        return ext
+    return ext or "jpeg"
+
+
+def file_data_url(path: Path) -> str:
+    """Encode a file as-is, taking the image type from its extension."""
+    fmt = _image_type(path)
+    if fmt not in ("jpeg", "png", "webp"):
+        print(
+            f"Warning: unrecognised image extension for '{path}', using '{fmt}' in data URL.",
+            file=sys.stderr,
+        )
+    with path.open("rb") as f:
+        b64 = base64.b64encode(f.read()).decode("ascii")
+    return f"data:image/{fmt};base64,{b64}"
+
+
+def plain_data_url_size(path: Path) -> int:
+    """Length of file_data_url(path), without reading the file."""
+    return len(f"data:image/{_image_type(path)};base64,") + (path.stat().st_size + 2) // 3 * 4
+
+
+def _mb(nbytes: int) -> str:
+    return f"{nbytes / 1e6:.1f} MB"
+
+
+class ImageCache:
+    """Data URLs for local reference images, shrunk once and reused; safe to share between threads."""
+
+    def __init__(
+        self,
+        max_side: int = DEFAULT_MAX_SIDE,
+        fmt: str = "keep",
+        quality: int = DEFAULT_QUALITY,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown image format {fmt!r}; choose from {', '.join(FORMATS)}")
+        self.max_side = max_side
+        self.fmt = fmt
+        self.quality = quality
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._lock = threading.Lock()
+        # (path, mtime, size) -> content hash, so repeated uses skip re-hashing.
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._urls: Dict[str, str] = {}
+        self._warned = False
+        self.stats = {"files": 0, "uses": 0, "disk_hits": 0, "original_bytes": 0, "sent_bytes": 0}
+
+    def _settings(self) -> str:
+        if self.fmt == "original":
+            return "original"
+        return f"v{CACHE_VERSION}-{self.fmt}-{self.max_side}-q{self.quality}"
+
+    def _file_hash(self, path: Path) -> str:
+        st = path.stat()
+        stamp = (str(path.resolve()), st.st_mtime_ns, st.st_size)
+        digest = self._hashes.get(stamp)
+        if digest is None:
+            h = hashlib.sha256()
+            with path.open("rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+            digest = self._hashes[stamp] = h.hexdigest()
+        return digest
+
+    def _encode(self, path: Path) -> str:
+        original = file_data_url(path)
+        if self.fmt == "original":
+            return original
+        try:
+            from PIL import Image as PILImage, ImageOps
+        except ImportError:
+            if not self._warned:
+                print("Warning: Pillow is not installed; reference images are sent without downscaling.", file=sys.stderr)
+                self._warned = True
+            return original
+
+        try:
+            img = PILImage.open(path)
+        except OSError:
+            # Not an image Pillow can read; let Ark judge the file as it is.
+            return original
+        with img:
+            too_large = self.max_side > 0 and max(img.size) > self.max_side
+            lossy = self.fmt in LOSSY_FORMATS
+            if not too_large and not (lossy and path.stat().st_size >= RECOMPRESS_OVER):
+                return original
+            fmt = self.fmt if lossy else {"JPEG": "jpeg", "WEBP": "webp"}.get(img.format, "png")
+            # Apply the EXIF rotation before it is dropped with the metadata.
+            img = ImageOps.exif_transpose(img)
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+            palette = fmt == "png" and img.mode == "P"
+            if has_alpha and fmt == "jpeg":
+                # JPEG has no alpha: flatten onto white rather than keep whatever sits under transparent pixels.
+                rgba = img.convert("RGBA")
+                img = PILImage.new("RGB", rgba.size, "white")
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            elif fmt == "png" and img.mode in ("L", "LA", "RGB", "RGBA"):
+                pass  # PNG stores these as they are; expanding them would only add bytes.
+            elif has_alpha:
+                img = img.convert("RGBA")
+            else:
+                img = img.convert("RGB")
+            if too_large:
+                img.thumbnail((self.max_side, self.max_side), PILImage.LANCZOS)
+            if palette:
+                # Resampled in truecolour; back to a palette so the PNG does not grow.
+                img = img.quantize(method=PILImage.Quantize.FASTOCTREE if has_alpha else PILImage.Quantize.MEDIANCUT)
+            out = io.BytesIO()
+            img.save(out, format=fmt.upper(), quality=self.quality)
+
+        encoded = f"data:image/{fmt};base64,{base64.b64encode(out.getvalue()).decode('ascii')}"
+        if len(encoded) >= len(original):
+            return original
+        return encoded
+
+    def data_url(self, path: Path) -> str:
+        path = Path(path)
+        with self._lock:
+            key = f"{self._file_hash(path)}-{self._settings()}"
+            url = self._urls.get(key)
+            if url is None:
+                self.stats["files"] += 1
+                url = self._load(key)
+                if url is None:
+                    url = self._encode(path)
+                    self._store(key, url)
+                else:
+                    self.stats["disk_hits"] += 1
+                self._urls[key] = url
+            self.stats["uses"] += 1
+            self.stats["original_bytes"] += plain_data_url_size(path)
+            self.stats["sent_bytes"] += len(url)
+        return url
+
+    def _load(self, key: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        try:
+            return (self.cache_dir / f"{key}.txt").read_text(encoding="ascii")
+        except OSError:
+            return None
+
+    def _store(self, key: str, url: str) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / f"{key}.txt.tmp"
+            tmp.write_text(url, encoding="ascii")
+            os.replace(tmp, self.cache_dir / f"{key}.txt")
+        except OSError as e:
+            print(f"Warning: could not write image cache {self.cache_dir}: {e}", file=sys.stderr)
+
+    def summary(self) -> str:
+        s: Dict[str, Any] = dict(self.stats)
+        saved = s["original_bytes"] - s["sent_bytes"]
+        line = (
+            f"Reference images: {s['files']} file(s) used {s['uses']} time(s), {s['disk_hits']} from cache; "
+            f"sent {_mb(s['sent_bytes'])} instead of {_mb(s['original_bytes'])}"
+        )
+        return f"{line} (saved {_mb(saved)})" if saved > 0 else line
+
+
+def add_image_args(parser: argparse.ArgumentParser, default_max_side: int = DEFAULT_MAX_SIDE) -> None:
+    """The --image-max-side / --image-format options shared by the Ark scripts."""
+    parser.add_argument(
+        "--image-max-side",
+        type=int,
+        default=default_max_side,
+        help=(
+            "Downscale local reference images whose longer side exceeds this many pixels "
+            f"before sending; 0 keeps the size (default: {default_max_side})."
+        ),
+    )
+    parser.add_argument(
+        "--image-format",
+        choices=FORMATS,
+        default="keep",
+        help=(
+            "Encoding of local reference images: keep (default) only re-saves images that are "
+            "downscaled, in their own format; jpeg or webp also recompress (lossy) every file "
+            f"over {RECOMPRESS_OVER // 1024} KB; original sends files untouched, without downscaling."
+        ),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Encode reference images through the cache and report the savings")
+    parser.add_argument("images", nargs="+", help="Local image files")
+    add_image_args(parser)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Cache directory (default: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    cache = ImageCache(args.image_max_side, args.image_format, cache_dir=args.cache_dir)
+    for image in args.images:
+        path = Path(image)
+        if not path.is_file():
+            print(f"Error: image path does not exist or is not a file: {image}", file=sys.stderr)
+            sys.exit(1)
+        url = cache.data_url(path)
+        print(f"{image}: {_mb(plain_data_url_size(path))} -> {_mb(len(url))} ({url[5:url.index(';')]})")
+    print(cache.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "requests>=2.31.0",
+# ]
+# ///
+"""
+Resumable, multi-connection downloads for generated videos and images.
+
+download(request, url, output_path) fetches url into output_path:
+
+  - a one-byte Range probe learns the size and whether the server honours
+    Range. Files of at least MIN_SPLIT bytes are split into SEGMENT_SIZE
+    segments fetched over up to `connections` parallel connections with
+    1 MB buffers; smaller files use one connection;
+  - data goes to `<output>.part`, and `<output>.part.json` journals how
+    much of each segment is on disk. A download interrupted by an error,
+    Ctrl-C or a kill resumes where it stopped when it is called again for
+    the same file, even with a freshly signed URL, as long as the size and
+    ETag still match;
+  - the result is checked against the expected size and, when the server
+    sends one, the Content-MD5 or MD5-style ETag, then renamed into place
+    atomically, so output_path never holds a truncated file.
+
+`request` is a callable like `requests.Session.request`; ArkClient passes
+its own, so downloads share its connection pool and retry policy.
+
+Usage:
+    uv run ranged_download.py <url> <output> [--connections 4]
+    uv run ranged_download.py --selftest
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_CONNECTIONS = 4
+SEGMENT_SIZE = 8 << 20
+MIN_SPLIT = 4 << 20
+BUFFER_SIZE = 1 << 20
+SEGMENT_RETRIES = 3
+JOURNAL_EVERY = 0.5  # seconds between journal writes while data flows
+PART_SUFFIX = ".part"
+JOURNAL_SUFFIX = ".part.json"
+MD5_ETAG = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)\s*$")
+
+
+class DownloadError(RuntimeError):
+    pass
+
+
+def part_paths(output_path: Path) -> tuple[Path, Path]:
+    output_path = Path(output_path)
+    return (
+        output_path.with_name(output_path.name + PART_SUFFIX),
+        output_path.with_name(output_path.name + JOURNAL_SUFFIX),
+    )
+
+
+def expected_md5(headers, full_body: bool) -> Optional[str]:
+    """MD5 hex digest promised by the response headers, if any.
+
+    Content-MD5 describes the body actually sent, so it only counts for a
+    full (non-range) response. A strong ETag of 32 hex digits is the
+    object's MD5 on S3-style stores such as TOS.
+    """
+    if full_body and headers.get("Content-MD5"):
+        try:
+            return base64.b64decode(headers["Content-MD5"]).hex()
+        except ValueError:
+            pass
+    match = MD5_ETAG.match(headers.get("ETag") or "")
+    return match.group(1).lower() if match else None
+
+
+class _Journal:
+    """Bytes on disk per segment, saved atomically next to the .part file."""
+
+    def __init__(self, path: Path, meta: Dict[str, Any], done: List[int]) -> None:
+        self.path = path
+        self.meta = meta
+        self.done = done
+        self._lock = threading.Lock()
+        self._saved = 0.0
+
+    @classmethod
+    def load(cls, path: Path, meta: Dict[str, Any], segments: int) -> Optional["_Journal"]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("meta") != meta or len(data.get("done") or []) != segments:
+            return None
+        return cls(path, meta, [int(n) for n in data["done"]])
+
+    def advance(self, index: int, nbytes: int) -> None:
+        with self._lock:
+            self.done[index] += nbytes
+        if time.monotonic() - self._saved >= JOURNAL_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps({"meta": self.meta, "done": self.done})
+            self._saved = time.monotonic()
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def _probe(request: Callable, url: str, timeout: float):
+    """Return (response to stream from, or None when Range works; info about the file)."""
+    resp = request("GET", url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+    if resp.status_code == 206:
+        match = CONTENT_RANGE_TOTAL.search(resp.headers.get("Content-Range") or "")
+        info = {
+            "size": int(match.group(1)) if match else None,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "md5": expected_md5(resp.headers, full_body=False),
+        }
+        resp.close()
+        if info["size"] is not None:
+            return None, info
+        # Unknown total size: fall back to one plain stream.
+        resp = request("GET", url, stream=True, timeout=timeout)
+    elif resp.status_code == 416:
+        # Nothing satisfies bytes=0-0, i.e. an empty file.
+        resp.close()
+        resp = request("GET", url, stream=True, timeout=timeout)
+
+    if resp.status_code != 200:
+        body = resp.text[:500]
+        resp.close()
+        raise DownloadError(f"HTTP {resp.status_code}: {body}")
+    length = resp.headers.get("Content-Length")
+    return resp, {
+        "size": int(length) if length and length.isdigit() else None,
+        "md5": expected_md5(resp.headers, full_body=True),
+    }
+
+
+def _stream_whole(resp, part: Path) -> int:
+    """Write a plain 200 response to part; the server gave no way to resume."""
+    written = 0
+    with resp, part.open("wb") as f:
+        for chunk in resp.iter_content(chunk_size=BUFFER_SIZE):
+            if chunk:
+                f.write(chunk)
+                written += len(chunk)
+    return written
+
+
+def _fetch_segment(
+    request: Callable, url: str, part: Path, journal: _Journal, index: int,
+    start: int, end: int, timeout: float, stop: threading.Event,
+) -> None:
+    """Fetch bytes [start + done, end] of one segment, retrying from where each attempt stopped."""
+    failures = 0
+    while True:
+        pos = start + journal.done[index]
+        if pos > end or stop.is_set():
+            return
+        try:
+            resp = request("GET", url, headers={"Range": f"bytes={pos}-{end}"}, stream=True, timeout=timeout)
+            with resp:
+                if resp.status_code != 206:
+                    raise DownloadError(f"range request returned HTTP {resp.status_code}")
+                with part.open("r+b") as f:
+                    f.seek(pos)
+                    for chunk in resp.iter_content(chunk_size=BUFFER_SIZE):
+                        if stop.is_set():
+                            return
+                        if not chunk:
+                            continue
+                        chunk = chunk[: end + 1 - pos]
+                        f.write(chunk)
+                        # On disk (in the OS cache) before the journal claims it.
+                        f.flush()
+                        pos += len(chunk)
+                        journal.advance(index, len(chunk))
+            if pos <= end:
+                raise DownloadError(f"connection closed at byte {pos} of segment ending at {end}")
+            return
+        except (OSError, DownloadError) as e:
+            # requests' exceptions are OSErrors too.
+            failures += 1
+            if failures > SEGMENT_RETRIES or stop.is_set():
+                raise
+            print(f"Segment {index} interrupted ({e}), resuming at byte {pos}...", file=sys.stderr)
+            time.sleep(failures)
+
+
+def _verify_md5(path: Path, md5: str) -> None:
+    digest = hashlib.md5()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(SEGMENT_SIZE), b""):
+            digest.update(block)
+    if digest.hexdigest() != md5:
+        raise DownloadError(f"checksum mismatch: expected MD5 {md5}, got {digest.hexdigest()}")
+
+
+def download(
+    request: Callable,
+    url: str,
+    output_path: Path,
+    connections: int = DEFAULT_CONNECTIONS,
+    timeout: float = 300,
+) -> int:
+    """Download url to output_path via a journaled .part file; return its size in bytes.
+
+    Raises DownloadError (or the request's own exception) on failure,
+    leaving the .part file and journal in place to resume from next time.
+    """
+    output_path = Path(output_path)
+    part, journal_path = part_paths(output_path)
+    resp, info = _probe(request, url, timeout)
+    size = info["size"]
+
+    if resp is not None:
+        journal_path.unlink(missing_ok=True)
+        try:
+            written = _stream_whole(resp, part)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        if size is not None and written != size:
+            part.unlink(missing_ok=True)
+            raise DownloadError(f"size mismatch: expected {size} bytes, got {written}")
+        size = written
+    else:
+        segment_size = size if size < MIN_SPLIT else SEGMENT_SIZE
+        bounds = [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+        meta = {"size": size, "etag": info["etag"], "last_modified": info["last_modified"], "segment_size": segment_size}
+        journal = None
+        if part.exists() and part.stat().st_size == size:
+            journal = _Journal.load(journal_path, meta, len(bounds))
+        if journal is None:
+            with part.open("wb") as f:
+                f.truncate(size)
+            journal = _Journal(journal_path, meta, [0] * len(bounds))
+            journal.save()
+        elif sum(journal.done):
+            print(f"Resuming download at {sum(journal.done) * 100 // size}% ({sum(journal.done)} of {size} bytes)")
+
+        todo = [i for i, (start, end) in enumerate(bounds) if start + journal.done[i] <= end]
+        stop = threading.Event()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(connections, len(todo) or 1))) as pool:
+                futures = [
+                    pool.submit(_fetch_segment, request, url, part, journal, i, *bounds[i], timeout, stop)
+                    for i in todo
+                ]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    stop.set()
+                    raise
+        finally:
+            journal.save()
+        if sum(journal.done) != size:
+            raise DownloadError(f"size mismatch: expected {size} bytes, got {sum(journal.done)}")
+
+    if info["md5"]:
+        try:
+            _verify_md5(part, info["md5"])
+        except DownloadError:
+            # Corrupt data cannot be resumed from; start over next time.
+            part.unlink(missing_ok=True)
+            journal_path.unlink(missing_ok=True)
+            raise
+    os.replace(part, output_path)
+    journal_path.unlink(missing_ok=True)
+    return size
+
+
+class _Interrupted(Exception):
+    """Stands in for Ctrl-C or a kill in the self-test."""
+
+
+def _test_server(data: bytes):
+    """A local HTTP server for `data`; its attributes switch Range support, truncation and the ETag."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            server = self.server
+            match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+            if server.ranges and match:
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else len(data) - 1
+                body = data[start:end + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                body = data
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", server.etag)
+            self.end_headers()
+            if server.truncate and len(body) > 1:
+                # Send half the body, then drop the connection.
+                body = body[: len(body) // 2]
+                server.truncated += 1
+                self.close_connection = True
+            self.wfile.write(body)
+            server.sent += len(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.ranges, server.truncate, server.truncated, server.sent = True, False, 0, 0
+    server.etag = f'"{hashlib.md5(data).hexdigest()}"'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def selftest() -> None:
+    """Download from a local server with and without Range support, including an interrupted run."""
+    import requests
+
+    data = os.urandom(3 * SEGMENT_SIZE - 12345)
+    server = _test_server(data)
+    url = f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+    failures = []
+
+    def check(ok: bool, message: str) -> None:
+        print(f"{'ok' if ok else 'FAIL'}: {message}")
+        if not ok:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp, requests.Session() as session:
+        output = Path(tmp) / "video.mp4"
+        part, journal = part_paths(output)
+
+        def interruptible(method, url, **kwargs):
+            if server.truncated:
+                raise _Interrupted()
+            return session.request(method, url, **kwargs)
+
+        server.truncate = True
+        try:
+            download(interruptible, url, output)
+            check(False, "truncated Range download was interrupted")
+        except _Interrupted:
+            check(part.exists() and journal.exists() and not output.exists(),
+                  "interrupted Range download keeps .part and journal")
+        server.truncate, server.sent = False, 0
+        download(session.request, url, output)
+        check(output.read_bytes() == data, "resumed Range download matches the source")
+        check(server.sent < len(data), f"resume fetched {server.sent} of {len(data)} bytes")
+        check(not part.exists() and not journal.exists(), "resumed download cleans up .part and journal")
+
+        output.unlink()
+        server.ranges = False
+        download(session.request, url, output)
+        check(output.read_bytes() == data, "server without Range (200 instead of 206) falls back to one stream")
+
+        output.unlink()
+        server.ranges, server.etag = True, '"' + "0" * 32 + '"'
+        try:
+            download(session.request, url, output)
+            check(False, "MD5 mismatch is rejected")
+        except DownloadError:
+            check(not output.exists() and not part.exists(), "MD5 mismatch is rejected and .part removed")
+    server.shutdown()
+    if failures:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resumable multi-connection download of one URL")
+    parser.add_argument("url", nargs="?")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=DEFAULT_CONNECTIONS,
+        help=f"Parallel connections (default: {DEFAULT_CONNECTIONS})",
+    )
+    parser.add_argument("--selftest", action="store_true", help="Check resume and the no-Range fallback against a local server")
+    args = parser.parse_args()
+    if args.selftest:
+        selftest()
+        return
+    if not args.url or not args.output:
+        parser.error("url and output are required")
+
+    import requests
+
+    with requests.Session() as session:
+        started = time.perf_counter()
+        try:
+            size = download(session.request, args.url, Path(args.output), args.connections)
+        except (DownloadError, requests.RequestException) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(f"Saved {size} bytes to {args.output} in {elapsed:.1f}s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "requests>=2.31.0",
+# ]
+# ///
+"""
+Durable local ledger of Seedance video tasks.
+
+Every submission made by generate_video.py is recorded in a SQLite database
+together with a hash of its payload, its task_id, model, status, output
+path and timestamps. Submitting the same job again (same payload and
+output file) attaches to the recorded task instead of paying for a new one,
+and `resume` re-polls and downloads every task still pending after a crash
+or restart.
+
+Usage:
+    uv run task_ledger.py list [--all]
+    uv run task_ledger.py resume [--interval 10] [--timeout 1800]
+
+The ledger lives in outputs/seedance_tasks.db by default; set
+SEEDANCE_LEDGER or pass --ledger to use another file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_LEDGER = os.environ.get("SEEDANCE_LEDGER") or str(Path("outputs") / "seedance_tasks.db")
+# Tasks in these states need no more polling.
+DONE_STATUSES = ("downloaded", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    job_key TEXT PRIMARY KEY,
+    payload_hash TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    video_url TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_task_id ON tasks (task_id);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request payload (prompt, images, ratio, duration, model...)."""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def job_key(payload: Dict[str, Any], output_path: Path) -> str:
+    """Identity of a job: the same payload rendered to the same file."""
+    digest = hashlib.sha256(payload_hash(payload).encode("ascii"))
+    digest.update(str(Path(output_path).resolve()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TaskLedger:
+    """SQLite-backed record of submitted Seedance tasks, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_LEDGER) -> None:
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            # WAL lets a resume run and a batch run share the ledger.
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "TaskLedger":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def find(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM tasks WHERE job_key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def find_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM tasks WHERE task_id = ? ORDER BY created_at DESC LIMIT 1", (task_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def attachable(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded task for a job unless it failed (then a new task is needed)."""
+        entry = self.find(key)
+        if entry is None or entry["status"] == "failed":
+            return None
+        if entry["status"] == "downloaded" and not Path(entry["output_path"]).exists():
+            # The video was deleted; the task's URL may still be valid, so re-poll it.
+            self.update(entry["task_id"], "succeeded")
+            entry["status"] = "succeeded"
+        return entry
+
+    def record_submission(
+        self, key: str, payload: Dict[str, Any], task_id: str, model: str, output_path: Path
+    ) -> None:
+        now = _now()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tasks (job_key, payload_hash, task_id, model, status, output_path,"
+                " video_url, error, created_at, updated_at) VALUES (?, ?, ?, ?, 'submitted', ?, NULL, NULL, ?, ?)",
+                (key, payload_hash(payload), task_id, model, str(Path(output_path).resolve()), now, now),
+            )
+
+    def update(
+        self, task_id: str, status: str, video_url: Optional[str] = None, error: Optional[str] = None,
+        output_path: Optional[Path] = None,
+    ) -> None:
+        """Record a status change for a task; unknown task IDs are ignored."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, video_url = COALESCE(?, video_url), error = ?,"
+                " output_path = COALESCE(?, output_path), updated_at = ? WHERE task_id = ?",
+                (status, video_url, error, str(Path(output_path).resolve()) if output_path else None,
+                 _now(), task_id),
+            )
+
+    def note_error(self, task_id: str, error: str) -> None:
+        """Keep the last error for a task without changing its status, so `resume` retries it."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET error = ?, updated_at = ? WHERE task_id = ?", (error, _now(), task_id)
+            )
+
+    def pending(self) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" for _ in DONE_STATUSES)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM tasks WHERE status NOT IN ({placeholders}) ORDER BY created_at",
+                DONE_STATUSES,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM tasks ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+
+def format_entry(entry: Dict[str, Any]) -> str:
+    line = f"{entry['task_id']}  {entry['status']:<10}  {entry['updated_at']}  {entry['output_path']}"
+    if entry.get("error"):
+        line += f"\n    error: {entry['error'][:200]}"
+    return line
+
+
+def resume(ledger: TaskLedger, api_key: str, args: argparse.Namespace) -> int:
+    """Re-poll every pending task and download finished videos; return the number that failed."""
+    from get_video_task_status import pooled_client, track_tasks
+
+    entries = ledger.pending()
+    if not entries:
+        print("No pending tasks in the ledger.")
+        return 0
+    print(f"Resuming {len(entries)} pending task(s) from {ledger.path}...")
+    tasks = []
+    for entry in entries:
+        output_path = Path(entry["output_path"])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tasks.append((entry["task_id"], output_path))
+    with pooled_client(api_key, args) as client:
+        return asyncio.run(track_tasks(tasks, client, args, ledger))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect and resume the local Seedance task ledger")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER, help=f"Ledger database (default: {DEFAULT_LEDGER})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="Show recorded tasks (pending ones unless --all)")
+    p.add_argument("--all", action="store_true", help="Include downloaded and failed tasks")
+
+    p = sub.add_parser("resume", help="Re-poll pending tasks and download finished videos")
+    p.add_argument("--interval", type=int, default=10, help="Initial polling interval in seconds (default: 10)")
+    p.add_argument("--max-interval", type=int, default=60, help="Longest backoff between polls (default: 60)")
+    p.add_argument("--concurrency", type=int, default=8, help="Maximum simultaneous status requests (default: 8)")
+    p.add_argument("--timeout", type=int, default=1800, help="Maximum wait per task in seconds (default: 1800)")
+    p.add_argument("--api-key", "-k", help="Ark API key (overrides ARK_API_KEY env var).")
+
+    args = parser.parse_args()
+
+    with TaskLedger(args.ledger) as ledger:
+        if args.command == "list":
+            entries = ledger.all() if args.all else ledger.pending()
+            print(f"{len(entries)} task(s)")
+            for entry in entries:
+                print(format_entry(entry))
+            return
+
+        api_key = args.api_key or os.environ.get("ARK_API_KEY")
+        if not api_key:
+            print("Error: No Ark API key provided (use --api-key or ARK_API_KEY).", file=sys.stderr)
+            sys.exit(1)
+        failed = resume(ledger, api_key, args)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Propose candidate characters, scenes and props for a whole novel before reading it.
+
+A fast statistical pre-pass built on read_novel.py: the novel is split into
+character ranges that are counted in a process pool, then merged and ranked.
+Heuristics:
+
+  - 角色: 2-3 character sequences led by a common surname (or 3-4 led by a
+    compound surname) that also open clauses or appear as the subject of
+    dialogue attribution such as `X说：` / `X笑道：`, plus frequent
+    attribution subjects without a known surname (e.g. `药老`).
+  - 场景: 2-4 character sequences ending in a place suffix (城/山/宗/谷/...).
+  - 道具: 2-4 character sequences ending in an item suffix (剑/戒/丹/鼎/...).
+
+Usage:
+    python3 extract_entities.py <novel.txt> [--top 50] [--min-count 5] [--workers N] [--output candidates.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from read_novel import Novel
+
+CHUNK_CHARS = 262144
+MAX_NGRAM = 4
+DEFAULT_TOP = 50
+DEFAULT_MIN_COUNT = 5
+
+SURNAMES = set(
+    '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜戚谢邹喻柏窦章云苏潘葛范彭郎'
+    '鲁韦昌马苗凤花方俞任袁柳鲍史唐费薛雷贺倪汤滕殷罗毕郝安常乐于傅齐康伍余顾孟黄穆萧尹姚邵汪祁'
+    '毛狄米贝明臧计伏成戴宋庞熊纪舒屈项祝董梁杜阮蓝闵季贾路江童颜郭梅盛林钟徐邱骆高夏蔡田胡凌霍'
+    '虞万柯管卢莫房解丁邓洪包左石崔龚程邢裴陆荣翁荀甄曲封储靳焦牧山谷车侯班秋仲伊宫宁仇甘厉戎'
+    '叶龙古白商燕慕秦楚韩')
+COMPOUND_SURNAMES = {
+    '欧阳', '司马', '上官', '诸葛', '慕容', '东方', '独孤', '令狐', '南宫', '公孙',
+    '皇甫', '宇文', '长孙', '夏侯', '端木', '纳兰', '西门', '轩辕', '百里', '司徒',
+}
+PLACE_SUFFIXES = set('城山宗门谷府殿阁峰村镇国岛湖林洞院州岭脉河海原漠宫寺庙庄楼坊')
+ITEM_SUFFIXES = set('剑刀枪戟戒丹散鼎珠符诀经甲印杖鞭弓镜扇旗钟琴笛环镯佩囊卷图')
+STOP_CHARS = set('的了是在和与也就都着我你他她它们这那个说道得地把被向对从给又还')
+COMMON_WORDS = {
+    '已经', '曾经', '神经', '试图', '企图', '意图', '地图', '分散', '解散',
+    '方才', '周围', '明白', '高兴', '成为', '安静', '常常', '于是', '万一', '原来',
+}
+ATTRIBUTION = re.compile(
+    r'(?:(?:轻笑|苦笑|冷笑|微笑|大笑|笑|冷声|沉声|柔声|淡淡|轻声|低声|怒|叹|喝|问|叫|答|骂|说)道|说)'
+    r'(?=\s*[：:，,“「『])')
+CJK_RUN = re.compile(r'[\u4e00-\u9fff]+')
+
+_novel = None
+
+
+def _init_worker(filepath):
+    global _novel
+    _novel = Novel(filepath)
+
+
+def _add(table, key, pos):
+    entry = table.get(key)
+    if entry is None:
+        table[key] = [1, pos]
+    else:
+        entry[0] += 1
+
+
+def count_chunk(start, end):
+    """Count candidate-shaped n-grams starting in [start, end) of the novel.
+
+    Returns {category: {ngram: [count, first_offset]}} plus 'said' (dialogue
+    attribution subjects) and 'lead' (surname n-grams opening a clause). Reads MAX_NGRAM - 1 characters on each
+    side so sequences crossing the chunk edges are seen exactly once.
+    """
+    lead = min(start, MAX_NGRAM - 1)
+    text = _novel.read(start - lead, end - start + lead + MAX_NGRAM - 1)
+    base = start - lead
+    tables = {'person': {}, 'scene': {}, 'prop': {}, 'said': {}, 'lead': {}}
+    person, scene, prop, said, lead = (tables[k] for k in ('person', 'scene', 'prop', 'said', 'lead'))
+
+    for run in CJK_RUN.finditer(text):
+        word = run.group()
+        for i in range(len(word)):
+            pos = base + run.start() + i
+            if not start <= pos < end or word[i] in STOP_CHARS:
+                continue
+            for n in range(2, MAX_NGRAM + 1):
+                if i + n > len(word):
+                    break
+                gram = word[i:i + n]
+                if gram[-1] in STOP_CHARS or gram in COMMON_WORDS:
+                    continue
+                if (n <= 3 and gram[0] in SURNAMES) or (n >= 3 and gram[:2] in COMPOUND_SURNAMES):
+                    _add(person, gram, pos)
+                    if i == 0:
+                        _add(lead, gram, pos)
+                if gram[-1] in PLACE_SUFFIXES:
+                    _add(scene, gram, pos)
+                if gram[-1] in ITEM_SUFFIXES:
+                    _add(prop, gram, pos)
+
+    for m in ATTRIBUTION.finditer(text):
+        verb = base + m.start()
+        if not start <= verb < end:
+            continue
+        for n in (2, 3):
+            gram = text[max(m.start() - n, 0):m.start()]
+            if len(gram) == n and CJK_RUN.fullmatch(gram) and not STOP_CHARS & {gram[0], gram[-1]}:
+                _add(said, gram, verb - n)
+    return tables
+
+
+def merge(results):
+    merged = {'person': {}, 'scene': {}, 'prop': {}, 'said': {}, 'lead': {}}
+    for tables in results:
+        for category, table in tables.items():
+            target = merged[category]
+            for gram, (count, first) in table.items():
+                entry = target.get(gram)
+                if entry is None:
+                    target[gram] = [count, first]
+                else:
+                    entry[0] += count
+                    entry[1] = min(entry[1], first)
+    return merged
+
+
+def _drop_fragments(candidates):
+    # A candidate that mostly occurs inside a longer candidate is a fragment
+    # of it (e.g. `萧` + `炎` inside `萧炎`), so keep only the longer one.
+    kept = []
+    for name, count, first in candidates:
+        if any(name != other and name in other and other_count >= 0.8 * count
+               for other, other_count, _ in candidates):
+            continue
+        kept.append((name, count, first))
+    return kept
+
+
+def rank(merged, top, min_count):
+    said = merged['said']
+    lead = merged['lead']
+    places_and_items = [(gram, count) for table in (merged['scene'], merged['prop'])
+                        for gram, (count, _) in table.items() if count >= min_count]
+    people = {}
+    for gram, (count, first) in merged['person'].items():
+        if count < min_count or gram[-1] in PLACE_SUFFIXES or gram[-1] in ITEM_SUFFIXES:
+            continue
+        if any(gram in other and other_count >= 0.8 * count for other, other_count in places_and_items):
+            continue
+        if (gram in said or lead.get(gram, [0])[0] >= max(2, count * 0.1)):
+            people[gram] = (count, first)
+    for gram, (said_count, first) in said.items():
+        if said_count >= max(2, min_count // 2) and gram not in people:
+            people[gram] = (merged['person'].get(gram, [said_count])[0], first)
+
+    def entries(table, extra=None):
+        candidates = _drop_fragments(sorted(
+            ((gram, count, first) for gram, (count, first) in table.items() if count >= min_count),
+            key=lambda c: (-c[1], c[2])))
+        result = []
+        for gram, count, first in candidates[:top]:
+            entry = {'name': gram, 'count': count, 'first': first}
+            if extra is not None:
+                entry['said'] = extra.get(gram, [0])[0]
+            result.append(entry)
+        return result
+
+    return {
+        '角色': entries({gram: list(v) for gram, v in people.items()}, said),
+        '场景': entries(merged['scene']),
+        '道具': entries(merged['prop']),
+    }
+
+
+def extract_entities(filepath, top=DEFAULT_TOP, min_count=DEFAULT_MIN_COUNT, workers=None):
+    novel = Novel(filepath)
+    ranges = [(start, min(start + CHUNK_CHARS, novel.total)) for start in range(0, novel.total, CHUNK_CHARS)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(filepath,)) as pool:
+        results = pool.map(count_chunk, *zip(*ranges)) if ranges else []
+        merged = merge(results)
+    return dict(novel=os.path.abspath(filepath), chars=novel.total, **rank(merged, top, min_count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Propose candidate characters, scenes and props for a novel')
+    parser.add_argument('filepath', help='Path to the novel file (.txt or .nvz)')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help=f'Candidates per category (default: {DEFAULT_TOP})')
+    parser.add_argument('--min-count', type=int, default=DEFAULT_MIN_COUNT,
+                        help=f'Minimum occurrences for a candidate (default: {DEFAULT_MIN_COUNT})')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', help='Write the ranked JSON to this file instead of stdout')
+    args = parser.parse_args()
+
+    try:
+        result = extract_entities(args.filepath, args.top, args.min_count, args.workers)
+    except Exception as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    data = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+        print(f'候选资产已写入: {args.output}')
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Structured store for novel-reader assets, outline and reading progress.
+
+Keeps 角色/道具/场景 assets, outline entries and progress in one SQLite
+database (with an FTS5 full-text index over assets) inside the project
+directory, so checking whether an asset already exists is an indexed lookup
+instead of re-reading every text file. `export` writes the familiar
+大纲.txt / 读取进度.txt / <类型>/<名称>.txt files on demand.
+
+Usage:
+    python3 novel_store.py <项目目录> asset-upsert --type 角色 --name 萧炎 --attr 基本信息.性别=男 --offset 2046
+    python3 novel_store.py <项目目录> asset-get --type 角色 --name 萧炎
+    python3 novel_store.py <项目目录> asset-find 斗气
+    python3 novel_store.py <项目目录> asset-list [--type 角色]
+    python3 novel_store.py <项目目录> outline-add "萧炎测试斗之力..." [--start 0 --end 30000]
+    python3 novel_store.py <项目目录> progress-set --position 30000 --total 5512508
+    python3 novel_store.py <项目目录> progress-get
+    python3 novel_store.py <项目目录> export
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+DB_NAME = 'novel.db'
+ASSET_TYPES = {'角色': '角色', '道具': '道具', '场景': '场景',
+               'character': '角色', 'prop': '道具', 'scene': '场景'}
+OTHER_SECTION = '其他'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    attributes TEXT NOT NULL DEFAULT '{}',
+    notes TEXT NOT NULL DEFAULT '',
+    offsets TEXT NOT NULL DEFAULT '[]',
+    updated_at TEXT NOT NULL,
+    UNIQUE (type, name)
+);
+CREATE TABLE IF NOT EXISTS outline (
+    id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    start INTEGER,
+    end INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    position INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+'''
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def asset_type(value):
+    try:
+        return ASSET_TYPES[value]
+    except KeyError:
+        raise ValueError(f'unknown asset type: {value} (expected 角色, 道具 or 场景)')
+
+
+class NovelStore:
+    """SQLite-backed asset, outline and progress store for one reading project."""
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        os.makedirs(project_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(project_dir, DB_NAME))
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.trigram = self._create_search_table()
+
+    def _create_search_table(self):
+        # The trigram tokenizer (SQLite 3.34+) makes CJK substrings searchable;
+        # without it, searches fall back to LIKE scans.
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'asset_search'").fetchone()
+        if row:
+            return 'trigram' in row['sql']
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE asset_search USING fts5(name, body, tokenize='trigram')")
+            return True
+        except sqlite3.OperationalError:
+            self.conn.execute('CREATE VIRTUAL TABLE asset_search USING fts5(name, body)')
+            return False
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _row_to_asset(row):
+        return {
+            'type': row['type'],
+            'name': row['name'],
+            'attributes': json.loads(row['attributes']),
+            'notes': row['notes'],
+            'offsets': json.loads(row['offsets']),
+            'updated_at': row['updated_at'],
+        }
+
+    def get_asset(self, type_, name):
+        row = self.conn.execute('SELECT * FROM assets WHERE type = ? AND name = ?',
+                                (asset_type(type_), name)).fetchone()
+        return self._row_to_asset(row) if row else None
+
+    def upsert_asset(self, type_, name, attributes=None, notes=None, offsets=None):
+        """Create an asset or merge into the existing one; return (asset, created).
+
+        Attributes overwrite by key, notes are appended as new paragraphs and
+        source offsets are unioned.
+        """
+        type_ = asset_type(type_)
+        with self.conn:
+            row = self.conn.execute('SELECT * FROM assets WHERE type = ? AND name = ?',
+                                    (type_, name)).fetchone()
+            current = self._row_to_asset(row) if row else {'attributes': {}, 'notes': '', 'offsets': []}
+            merged_attributes = dict(current['attributes'], **(attributes or {}))
+            merged_notes = '\n\n'.join(n for n in (current['notes'], notes) if n)
+            merged_offsets = sorted(set(current['offsets']) | set(offsets or []))
+            values = (json.dumps(merged_attributes, ensure_ascii=False), merged_notes,
+                      json.dumps(merged_offsets), _now())
+            if row:
+                asset_id = row['id']
+                self.conn.execute(
+                    'UPDATE assets SET attributes = ?, notes = ?, offsets = ?, updated_at = ? WHERE id = ?',
+                    values + (asset_id,))
+                self.conn.execute('DELETE FROM asset_search WHERE rowid = ?', (asset_id,))
+            else:
+                asset_id = self.conn.execute(
+                    'INSERT INTO assets (attributes, notes, offsets, updated_at, type, name) VALUES (?, ?, ?, ?, ?, ?)',
+                    values + (type_, name)).lastrowid
+            body = '\n'.join([f'{k}：{v}' for k, v in merged_attributes.items()] + [merged_notes])
+            self.conn.execute('INSERT INTO asset_search (rowid, name, body) VALUES (?, ?, ?)',
+                              (asset_id, name, body))
+        return self.get_asset(type_, name), row is None
+
+    def find_assets(self, query, type_=None, limit=20):
+        """Full-text search over asset names, attributes and notes.
+
+        Queries of 3+ characters use the trigram index; shorter ones (and
+        every query without the trigram tokenizer) scan with LIKE.
+        """
+        if self.trigram and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = ('SELECT assets.* FROM asset_search JOIN assets ON assets.id = asset_search.rowid '
+                   'WHERE asset_search MATCH ?')
+            params = [phrase]
+        else:
+            sql = ('SELECT assets.* FROM asset_search JOIN assets ON assets.id = asset_search.rowid '
+                   'WHERE (asset_search.name LIKE ? OR asset_search.body LIKE ?)')
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            sql = sql.replace('LIKE ?', "LIKE ? ESCAPE '\\'")
+            params = [pattern, pattern]
+        if type_:
+            sql += ' AND assets.type = ?'
+            params.append(asset_type(type_))
+        sql += ' ORDER BY assets.name = ? DESC, assets.updated_at DESC LIMIT ?'
+        params += [query, limit]
+        return [self._row_to_asset(row) for row in self.conn.execute(sql, params)]
+
+    def list_assets(self, type_=None):
+        if type_:
+            rows = self.conn.execute('SELECT * FROM assets WHERE type = ? ORDER BY id', (asset_type(type_),))
+        else:
+            rows = self.conn.execute('SELECT * FROM assets ORDER BY type, id')
+        return [self._row_to_asset(row) for row in rows]
+
+    def add_outline(self, summary, start=None, end=None):
+        """Append an outline entry and return its 1-based number."""
+        with self.conn:
+            self.conn.execute('INSERT INTO outline (summary, start, end, created_at) VALUES (?, ?, ?, ?)',
+                              (summary, start, end, _now()))
+            return self.conn.execute('SELECT COUNT(*) FROM outline').fetchone()[0]
+
+    def outline(self):
+        return [dict(row) for row in self.conn.execute('SELECT summary, start, end FROM outline ORDER BY id')]
+
+    def save_progress(self, position, total):
+        with self.conn:
+            self.conn.execute(
+                'INSERT INTO progress (id, position, total, updated_at) VALUES (1, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET position = excluded.position, total = excluded.total, '
+                'updated_at = excluded.updated_at',
+                (position, total, _now()))
+
+    def progress(self):
+        row = self.conn.execute('SELECT position, total FROM progress WHERE id = 1').fetchone()
+        return dict(row) if row else None
+
+    def export(self, directory=None):
+        """Write 大纲.txt, 读取进度.txt and <类型>/<名称>.txt; return the written paths."""
+        directory = directory or self.project_dir
+        written = []
+        entries = [f'{i}. {entry["summary"]}' for i, entry in enumerate(self.outline(), 1)]
+        written.append(_write_text(os.path.join(directory, '大纲.txt'), '\n\n'.join(entries)))
+        progress = self.progress()
+        if progress:
+            written.append(_write_text(os.path.join(directory, '读取进度.txt'), format_progress(progress)))
+        for asset in self.list_assets():
+            path = os.path.join(directory, asset['type'], _safe_filename(asset['name']) + '.txt')
+            written.append(_write_text(path, format_asset(asset)))
+        return written
+
+
+def format_progress(progress):
+    position, total = progress['position'], progress['total']
+    percent = (position / total * 100) if total > 0 else 0
+    return (f'当前位置: {position}\n'
+            f'已读字数: {position}\n'
+            f'总字数: {total}\n'
+            f'进度: {percent:.2f}%')
+
+
+def format_asset(asset):
+    """Render an asset in the SKILL.md text layout, grouping `section.field` attributes."""
+    sections = {}
+    for key, value in asset['attributes'].items():
+        section, _, field = key.rpartition('.')
+        sections.setdefault(section or OTHER_SECTION, []).append(f'{field}：{value}')
+    lines = [asset['name']]
+    for section, fields in sections.items():
+        lines += ['', f'【{section}】'] + fields
+    if asset['notes']:
+        lines += ['', '【补充信息】', asset['notes']]
+    if asset['offsets']:
+        lines += ['', '【出现位置】', '、'.join(map(str, asset['offsets']))]
+    return '\n'.join(lines)
+
+
+def _safe_filename(name):
+    return ''.join('_' if c in '/\\:*?"<>|' else c for c in name).strip() or '_'
+
+
+def _write_text(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    os.replace(tmp, path)
+    return path
+
+
+def _parse_attrs(pairs):
+    attributes = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep or not key:
+            raise ValueError(f'attribute must be KEY=VALUE, got {pair}')
+        attributes[key.strip()] = value.strip()
+    return attributes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Structured asset, outline and progress store for novel-reader')
+    parser.add_argument('project', help='Project directory (holds novel.db and exported text files)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('asset-upsert', help='Create or update an asset')
+    p.add_argument('--type', required=True, help='角色, 道具 or 场景')
+    p.add_argument('--name', required=True, help='Asset name')
+    p.add_argument('--attr', action='append', metavar='KEY=VALUE',
+                   help='Attribute, optionally grouped as 分组.字段=值 (repeatable)')
+    p.add_argument('--note', help='Free-form text appended to the asset')
+    p.add_argument('--offset', type=int, action='append', help='Source character offset (repeatable)')
+
+    p = sub.add_parser('asset-get', help='Show one asset')
+    p.add_argument('--type', required=True, help='角色, 道具 or 场景')
+    p.add_argument('--name', required=True, help='Asset name')
+
+    p = sub.add_parser('asset-find', help='Full-text search over assets')
+    p.add_argument('query', help='Text to search for')
+    p.add_argument('--type', help='Restrict to 角色, 道具 or 场景')
+    p.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+
+    p = sub.add_parser('asset-list', help='List asset names')
+    p.add_argument('--type', help='Restrict to 角色, 道具 or 场景')
+
+    p = sub.add_parser('outline-add', help='Append an outline entry')
+    p.add_argument('summary', help='Summary text')
+    p.add_argument('--start', type=int, help='Start character offset covered by the entry')
+    p.add_argument('--end', type=int, help='End character offset covered by the entry')
+
+    p = sub.add_parser('progress-set', help='Atomically save reading progress')
+    p.add_argument('--position', type=int, required=True, help='Current character position')
+    p.add_argument('--total', type=int, required=True, help='Total characters in the novel')
+
+    sub.add_parser('progress-get', help='Show reading progress')
+
+    p = sub.add_parser('export', help='Write 大纲.txt, 读取进度.txt and asset text files')
+    p.add_argument('--dir', help='Target directory (default: the project directory)')
+
+    args = parser.parse_args()
+
+    try:
+        with NovelStore(args.project) as store:
+            if args.command == 'asset-upsert':
+                asset, created = store.upsert_asset(args.type, args.name, _parse_attrs(args.attr),
+                                                    args.note, args.offset)
+                print(f'{"新建" if created else "更新"}{asset["type"]}: {asset["name"]}')
+            elif args.command == 'asset-get':
+                asset = store.get_asset(args.type, args.name)
+                if asset is None:
+                    print(f'不存在: {args.type}/{args.name}')
+                    sys.exit(1)
+                print(format_asset(asset))
+            elif args.command == 'asset-find':
+                results = store.find_assets(args.query, args.type, args.limit)
+                print(f'找到 {len(results)} 个资产')
+                for asset in results:
+                    print(f'{asset["type"]}/{asset["name"]}')
+            elif args.command == 'asset-list':
+                assets = store.list_assets(args.type)
+                print(f'共 {len(assets)} 个资产')
+                for asset in assets:
+                    print(f'{asset["type"]}/{asset["name"]}')
+            elif args.command == 'outline-add':
+                number = store.add_outline(args.summary, args.start, args.end)
+                print(f'已添加大纲第 {number} 条')
+            elif args.command == 'progress-set':
+                store.save_progress(args.position, args.total)
+                print(format_progress(store.progress()))
+            elif args.command == 'progress-get':
+                progress = store.progress()
+                print(format_progress(progress) if progress else '尚无读取进度')
+            elif args.command == 'export':
+                paths = store.export(args.dir)
+                print(f'已导出 {len(paths)} 个文件')
+    except Exception as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,52 +1,1135 @@
 #!/usr/bin/env python3
 import argparse
+import array
+import bisect
+import bz2
+import hashlib
+import io
+import json
+import lzma
+import math
+import os
+import random
+import re
+import signal
+import socket
+import socketserver
+import string
+import struct
 import sys
+import threading
+import zlib
+from collections import OrderedDict
 
+SEGMENT_SIZE = 3000
+INDEX_VERSION = 3
+INDEX_SUFFIX = '.index.json'
+CHECKPOINT_BYTES = 8192
+TAIL_HASH_BYTES = 4096
+DEFAULT_SOCKET = os.environ.get('NOVEL_READER_SOCKET') or os.path.join(
+    os.environ.get('TMPDIR', '/tmp'), f'novel-reader-{os.getuid() if hasattr(os, "getuid") else 0}.sock')
+DEFAULT_CACHE_SIZE = 4
+DEFAULT_CHAPTER_PATTERNS = [
+    r'[=【\[\s]*第[0-9０-９零〇一二两三四五六七八九十百千万]+[章回节话卷集幕篇部]',
+    r'(?i:chapter)\s+[0-9a-z]+',
+]
+MAX_HEADING_CHARS = 50
+HEADING_DECORATION = '=-*#【】[] \u3000'
+PREFACE_TITLE = '（开篇）'
+PACK_MAGIC = b'NVZ1'
+PACK_SUFFIX = '.nvz'
+PACK_BLOCK_CHARS = 65536
+PACK_CODECS = {
+    'lzma': (lzma.compress, lzma.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+}
+DEFAULT_PACK_CODEC = 'lzma'
+SEARCH_MAGIC = b'NVS1'
+SEARCH_SUFFIX = '.search.idx'
+_SEARCH_ENTRY = struct.Struct('<IIQI')  # bigram code points, postings offset, posting count
+DEFAULT_SEARCH_CONTEXT = 30
+DEFAULT_SEARCH_LIMIT = 20
+BOILERPLATE_TITLE = re.compile(r'感言|访谈|请假|上架|求票|月票|推荐票|新书推荐|作者的话|题外话|单章')
+BOILERPLATE_LINE = re.compile(
+    r'https?://|www\.|\.com\b|求(?:月票|推荐票|收藏|订阅|打赏)|本章完|首发域名|最新章节|手机(?:用户|阅读)|^[Pp][Ss][：:]')
+DECORATED_HEADING = re.compile(r'^(?:[=＝]{2,}.*[=＝]{2,}|【[^】]{1,30}】)$')
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MINHASH_PRIME = (1 << 61) - 1
+DUPLICATE_THRESHOLD = 0.8
+MIN_DUPLICATE_PARAGRAPHS = 3
+SENTENCE_END = re.compile('[。！？」』”\n]+')
+_ASCII_PUNCT_DELETE = dict.fromkeys(map(ord, string.punctuation))
 
-def get_novel_info(filepath):
+
+def _safe_cut(data):
+    # Cut before a byte that starts a character, never inside '\r\n',
+    # so each piece decodes exactly as it would inside the whole file.
+    for i in range(len(data) - 1, max(len(data) - 8, 0), -1):
+        if data[i] & 0xC0 != 0x80 and data[i - 1] != 0x0D:
+            return i
+    return 0
+
+
+def _decode(data):
+    text = data.decode('utf-8', errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def iter_pieces(f, block_size=CHECKPOINT_BYTES):
+    """Yield (text, byte_count) pieces of a binary file, split on character boundaries."""
+    carry = b''
+    while True:
+        data = f.read(block_size)
+        if not data:
+            break
+        data = carry + data
+        cut = _safe_cut(data)
+        if cut == 0 and len(data) > 4 * block_size:
+            cut = len(data)
+        carry = data[cut:]
+        if cut:
+            yield _decode(data[:cut]), cut
+    if carry:
+        yield _decode(carry), len(carry)
+
+
+def index_path(filepath):
+    return filepath + INDEX_SUFFIX
+
+
+class _TextStats:
+    """Incremental character, line and non-empty-line counts over text pieces."""
+
+    def __init__(self):
+        self.chars = 0
+        self.lines = 1
+        self.non_empty_lines = 0
+        self._line_has_text = False
+
+    def feed(self, text):
+        self.chars += len(text)
+        parts = text.split('\n')
+        self._line_has_text = self._line_has_text or bool(parts[0].strip())
+        for part in parts[1:]:
+            self.non_empty_lines += self._line_has_text
+            self._line_has_text = bool(part.strip())
+        self.lines += len(parts) - 1
+
+    def state(self):
+        return [self.chars, self.lines, self.non_empty_lines, self._line_has_text]
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        stats.chars, stats.lines, stats.non_empty_lines, stats._line_has_text = state
+        return stats
+
+    def result(self):
+        return {
+            'chars': self.chars,
+            'lines': self.lines,
+            'non_empty_lines': self.non_empty_lines + self._line_has_text,
+        }
+
+
+def _read_pack_footer(f):
+    trailer = struct.calcsize('<Q') + len(PACK_MAGIC)
+    f.seek(-trailer, os.SEEK_END)
+    length, magic = struct.unpack('<Q4s', f.read(trailer))
+    if magic != PACK_MAGIC:
+        raise ValueError('truncated or corrupt packed novel')
+    f.seek(-(trailer + length), os.SEEK_END)
+    return json.loads(f.read(length).decode('utf-8'))
+
+
+def pack_novel(src, dst, codec=DEFAULT_PACK_CODEC):
+    """Write src as independently compressed blocks of PACK_BLOCK_CHARS characters.
+
+    Layout: magic, compressed blocks, JSON footer (counts + block index),
+    footer length, magic. Returns the footer.
+    """
+    compress = PACK_CODECS[codec][0]
+    stats = _TextStats()
+    blocks = []
+    tmp = f'{dst}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    with open(src, 'rb') as f, open(tmp, 'wb') as out:
+        out.write(PACK_MAGIC)
+        offset = len(PACK_MAGIC)
+        chars = 0
+        pending = ''
+
+        def write_block(text):
+            nonlocal offset, chars
+            data = compress(text.encode('utf-8'))
+            out.write(data)
+            blocks.append([chars, offset, len(data)])
+            offset += len(data)
+            chars += len(text)
+
+        for text, _ in iter_pieces(f, block_size=1 << 20):
+            stats.feed(text)
+            pending += text
+            while len(pending) >= PACK_BLOCK_CHARS:
+                write_block(pending[:PACK_BLOCK_CHARS])
+                pending = pending[PACK_BLOCK_CHARS:]
+        if pending or not blocks:
+            write_block(pending)
+
+        footer = dict(stats.result(), version=1, codec=codec, blocks=blocks)
+        data = json.dumps(footer, separators=(',', ':')).encode('utf-8')
+        out.write(data)
+        out.write(struct.pack('<Q', len(data)) + PACK_MAGIC)
+    os.replace(tmp, dst)
+    return footer
+
+
+def _tail_hash(f, size):
+    f.seek(max(size - TAIL_HASH_BYTES, 0))
+    return hashlib.sha1(f.read(min(size, TAIL_HASH_BYTES))).hexdigest()
+
+
+def _scan_plain(f, index, stats, checkpoints, offset):
+    # Index plain text from byte `offset` (a checkpoint) to EOF. The stats
+    # snapshot taken before the last piece lets a later append resume there,
+    # re-reading at most one piece in case it ended mid-character or on '\r'.
+    f.seek(offset)
+    resume = [offset, stats.state()]
+    for text, nbytes in iter_pieces(f):
+        checkpoints.append([stats.chars, offset])
+        resume = [offset, stats.state()]
+        stats.feed(text)
+        offset += nbytes
+    index.update(stats.result(), checkpoints=checkpoints or [[0, 0]], resume=resume,
+                 tail_hash=_tail_hash(f, offset))
+    return index
+
+
+def build_index(filepath):
+    """Scan the file once in bounded memory, collecting counts and offset checkpoints.
+
+    Packed novels carry their counts and block index in the footer, which
+    is used as-is instead of scanning.
+    """
+    st = os.stat(filepath)
+    index = {'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    with open(filepath, 'rb') as f:
+        if f.read(len(PACK_MAGIC)) == PACK_MAGIC:
+            footer = _read_pack_footer(f)
+            index.update(chars=footer['chars'], lines=footer['lines'],
+                         non_empty_lines=footer['non_empty_lines'],
+                         codec=footer['codec'], blocks=footer['blocks'])
+            return index
+        return _scan_plain(f, index, _TextStats(), [], 0)
+
+
+def extend_index(filepath, old):
+    """Update a plain-text index after a pure append, or return None if the file was rewritten.
+
+    Only bytes from the last checkpoint on are scanned. Cached chapter and
+    segment tables are extended by re-running detection from their last
+    entry, which gives the same result as a full rebuild.
+    """
+    st = os.stat(filepath)
+    if 'resume' not in old or st.st_size < old['size']:
+        return None
+    with open(filepath, 'rb') as f:
+        if _tail_hash(f, old['size']) != old['tail_hash']:
+            return None
+        offset, state = old['resume']
+        checkpoints = [c for c in old['checkpoints'] if c[1] < offset]
+        index = {'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        _scan_plain(f, index, _TextStats.from_state(state), checkpoints, offset)
+
+    chapters = old.get('chapters')
+    if chapters and chapters['items']:
+        keep = chapters['items'][:-1]
+        tail_start = chapters['items'][-1][0]
+        tail, _ = detect_chapters(iter_text(filepath, index, tail_start), chapters['patterns'])
+        if tail and tail[0][0] == 0:
+            items = keep + [[start + tail_start, length, title] for start, length, title in tail]
+            index['chapters'] = dict(chapters, items=items)
+
+    tables = {}
+    for key, starts in old.get('segments', {}).items():
+        budget, cost = _segment_budget(key)
+        tail, _ = segment_starts(iter_text(filepath, index, starts[-1]), budget, cost)
+        tables[key] = starts[:-1] + [start + starts[-1] for start in tail]
+    index['segments'] = tables
+    return index
+
+
+class IndexBuilder:
+    """Build a plain-text index from text as it is being written, instead of re-reading the file.
+
+    Feed every piece of text exactly as written (UTF-8, '\n' newlines only),
+    then call finish() once the file is complete. The result matches what
+    build_index would produce for it, plus the chapter table for `patterns`.
+    """
+
+    def __init__(self, patterns=None):
+        self.stats = _TextStats()
+        self.checkpoints = []
+        self.resume = [0, self.stats.state()]
+        self.chapters = _ChapterScanner(patterns) if patterns else None
+        self.patterns = patterns
+        self.offset = 0
+        self._since_checkpoint = 0
+
+    def feed(self, text):
+        for i in range(0, len(text), CHECKPOINT_BYTES):
+            piece = text[i:i + CHECKPOINT_BYTES]
+            if not self.checkpoints or self._since_checkpoint >= CHECKPOINT_BYTES:
+                self.checkpoints.append([self.stats.chars, self.offset])
+                self.resume = [self.offset, self.stats.state()]
+                self._since_checkpoint = 0
+            nbytes = len(piece.encode('utf-8'))
+            self.offset += nbytes
+            self._since_checkpoint += nbytes
+            self.stats.feed(piece)
+            if self.chapters:
+                self.chapters.feed(piece)
+
+    def finish(self, filepath):
+        st = os.stat(filepath)
+        if st.st_size != self.offset:
+            raise ValueError(f'{filepath} has {st.st_size} bytes, but {self.offset} were indexed')
+        index = {'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        with open(filepath, 'rb') as f:
+            tail_hash = _tail_hash(f, st.st_size)
+        index.update(self.stats.result(), checkpoints=self.checkpoints or [[0, 0]],
+                     resume=self.resume, tail_hash=tail_hash)
+        if self.chapters:
+            items, preface = self.chapters.result()
+            index['chapters'] = {'patterns': self.patterns, 'items': items, 'preface': preface}
+        return index
+
+
+def save_index(filepath, index):
+    path = index_path(filepath)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
     try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-            lines = content.split('\n')
-            char_count = len(content)
-            line_count = len(lines)
-            non_empty_lines = sum(1 for line in lines if line.strip())
-            print(f'总字符数: {char_count}')
-            print(f'总行数: {line_count}')
-            print(f'非空行数: {non_empty_lines}')
-    except Exception as e:
-        print(f'Error: {e}', file=sys.stderr)
-        sys.exit(1)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp, path)
+    except OSError:
+        # Read-only directories still work, just without the cached index.
+        if os.path.exists(tmp):
+            os.remove(tmp)
 
 
-def read_novel_segment(filepath, start):
+def load_index(filepath):
+    """Return the offset index for filepath, extending or rebuilding it when the file changed."""
+    st = os.stat(filepath)
+    index = None
     try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-            total = len(content)
-            segment = content[start:start + 3000]
-            end = min(start + 3000, total)
-            count = len(segment)
-            progress = (end / total * 100) if total > 0 else 0
-            print(segment)
-            print(f'[start:{start}, end:{end}, count:{count}, progress:{progress:.2f}%]')
-    except Exception as e:
-        print(f'Error: {e}', file=sys.stderr)
-        sys.exit(1)
+        with open(index_path(filepath), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == INDEX_VERSION:
+            if cached.get('size') == st.st_size and cached.get('mtime_ns') == st.st_mtime_ns:
+                return cached
+            index = extend_index(filepath, cached)
+    except (OSError, ValueError):
+        pass
+    if index is None:
+        index = build_index(filepath)
+    save_index(filepath, index)
+    return index
+
+
+def _iter_blocks(f, index, first=0):
+    decompress = PACK_CODECS[index['codec']][1]
+    for _, offset, length in index['blocks'][first:]:
+        f.seek(offset)
+        yield decompress(f.read(length)).decode('utf-8')
+
+
+def iter_text(filepath, index, start=0, block_size=1 << 20):
+    """Yield the novel's text from character offset `start` as pieces, plain or packed.
+
+    Seeks via the index, so for packed novels decompression starts at the
+    block containing `start`.
+    """
+    anchors = index['blocks'] if 'blocks' in index else index['checkpoints']
+    i = max(bisect.bisect_right([a[0] for a in anchors], start) - 1, 0)
+    anchor_char, anchor_byte = anchors[i][:2]
+    skip = start - anchor_char
+    with open(filepath, 'rb') as f:
+        if 'blocks' in index:
+            texts = _iter_blocks(f, index, i)
+        else:
+            f.seek(anchor_byte)
+            texts = (text for text, _ in iter_pieces(f, block_size))
+        for text in texts:
+            if skip >= len(text):
+                skip -= len(text)
+                continue
+            yield text[skip:] if skip else text
+            skip = 0
+
+
+def read_chars(filepath, index, start, count):
+    """Decode `count` characters from character offset `start`, seeking via the index."""
+    parts = []
+    have = 0
+    for text in iter_text(filepath, index, start, CHECKPOINT_BYTES):
+        parts.append(text)
+        have += len(text)
+        if have >= count:
+            break
+    return ''.join(parts)[:count]
+
+
+class _ChapterScanner:
+    """Incremental chapter detection: feed text pieces in order, then call result()."""
+
+    def __init__(self, patterns):
+        self.heading = re.compile('|'.join(f'(?:{p})' for p in patterns))
+        self.starts = []
+        self.titles = []
+        self.preface_text = False
+        self.body_seen = False
+        self.offset = 0
+        self.pending = ''
+
+    def _visit(self, line, line_start):
+        stripped = line.strip()
+        if not stripped:
+            return
+        if len(stripped) <= MAX_HEADING_CHARS and self.heading.match(stripped):
+            if self.starts and not self.body_seen:
+                return
+            self.starts.append(line_start)
+            self.titles.append(stripped.strip(HEADING_DECORATION) or stripped)
+            self.body_seen = False
+        elif self.starts:
+            self.body_seen = True
+        else:
+            self.preface_text = True
+
+    def feed(self, text):
+        lines = (self.pending + text).split('\n')
+        self.pending = lines.pop()
+        for line in lines:
+            self._visit(line, self.offset)
+            self.offset += len(line) + 1
+
+    def result(self):
+        self._visit(self.pending, self.offset)
+        total = self.offset + len(self.pending)
+        starts, titles = list(self.starts), list(self.titles)
+        has_preface = self.preface_text and bool(starts) and starts[0] > 0
+        if has_preface:
+            starts.insert(0, 0)
+            titles.insert(0, PREFACE_TITLE)
+        bounds = starts[1:] + [total]
+        chapters = [[s, e - s, t] for s, e, t in zip(starts, bounds, titles)]
+        return chapters, has_preface
+
+
+def detect_chapters(pieces, patterns):
+    """Scan text pieces once and return (chapters, has_preface).
+
+    Each chapter is [start, length, title]. Consecutive heading lines with
+    no body text between them (e.g. a decorated heading repeated as plain
+    text) count as one heading.
+    """
+    scanner = _ChapterScanner(patterns)
+    for text in pieces:
+        scanner.feed(text)
+    return scanner.result()
+
+
+def estimate_tokens(text):
+    """Cheap offline token estimate: ASCII words pack ~4 chars per token,
+    ASCII punctuation ~2, and CJK or other non-ASCII characters ~1 each."""
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    punct = ascii_chars - len(text.translate(_ASCII_PUNCT_DELETE).encode('ascii', 'ignore'))
+    return (len(text) - ascii_chars) + punct / 2 + (ascii_chars - punct) / 4
+
+
+def _hard_cut(text, budget, cost):
+    # Longest non-empty prefix of text whose cost fits in budget.
+    lo, hi = 1, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if cost(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _segment_budget(key):
+    # Segment tables are cached under 'chars:N' or 'tokens:N'.
+    unit, budget = key.split(':')
+    return int(budget), estimate_tokens if unit == 'tokens' else len
+
+
+def segment_starts(pieces, budget, cost=len):
+    """Scan text pieces once and return (starts, total) for sentence-aligned segments.
+
+    Sentences are packed greedily while their summed cost (characters by
+    default, or e.g. estimate_tokens) fits in `budget`, so each segment ends
+    after the last sentence or paragraph boundary that fits. A sentence
+    that alone exceeds the budget is hard-cut.
+    """
+    starts = [0]
+    seg_cost = 0
+    offset = 0
+    pending = ''
+
+    def add(sentence, start):
+        nonlocal seg_cost
+        c = cost(sentence)
+        if seg_cost + c <= budget:
+            seg_cost += c
+            return
+        if seg_cost:
+            starts.append(start)
+        while c > budget:
+            cut = _hard_cut(sentence, budget, cost)
+            start += cut
+            starts.append(start)
+            sentence = sentence[cut:]
+            c = cost(sentence)
+        seg_cost = c
+
+    for text in pieces:
+        text = pending + text
+        prev = 0
+        for m in SENTENCE_END.finditer(text):
+            if m.end() < len(text):
+                add(text[prev:m.end()], offset + prev)
+                prev = m.end()
+        pending = text[prev:]
+        offset += prev
+    if pending:
+        add(pending, offset)
+    return starts, offset + len(pending)
+
+
+def detect_boilerplate(pieces, patterns):
+    """Scan lines once and return [start, end, reason, label] ranges of boilerplate.
+
+    A heading (chapter pattern or decorated line such as `===上架感言===`)
+    whose title matches BOILERPLATE_TITLE opens a range that runs to the
+    next heading; outside such sections, single lines matching
+    BOILERPLATE_LINE (URLs, vote begging, `PS：`) are ranges of their own.
+    """
+    heading = re.compile('|'.join(f'(?:{p})' for p in patterns))
+    ranges = []
+    block = None
+    offset = 0
+    pending = ''
+
+    def visit(line, line_start):
+        nonlocal block
+        stripped = line.strip()
+        if not stripped:
+            return
+        if len(stripped) <= MAX_HEADING_CHARS and (heading.match(stripped) or DECORATED_HEADING.match(stripped)):
+            if block:
+                ranges.append([block[0], line_start, 'boilerplate', block[1]])
+                block = None
+            if BOILERPLATE_TITLE.search(stripped):
+                block = (line_start, stripped.strip(HEADING_DECORATION) or stripped)
+        elif block is None and BOILERPLATE_LINE.search(stripped):
+            ranges.append([line_start, line_start + len(line) + 1, 'ad', stripped[:MAX_HEADING_CHARS]])
+
+    for text in pieces:
+        lines = (pending + text).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            visit(line, offset)
+            offset += len(line) + 1
+    visit(pending, offset)
+    total = offset + len(pending)
+    if block:
+        ranges.append([block[0], total, 'boilerplate', block[1]])
+    for r in ranges:
+        r[1] = min(r[1], total)
+    return ranges
+
+
+def detect_duplicates(novel, chapters):
+    """Find chapters repeating an earlier one with MinHash/LSH over their paragraphs.
+
+    Each chapter becomes the set of its whitespace-normalised paragraph
+    hashes; chapters sharing an LSH band are compared by signature
+    agreement, and the later of a pair above DUPLICATE_THRESHOLD is
+    returned as a [start, end, 'duplicate', label] range.
+    """
+    rng = random.Random(0)
+    params = [(rng.randrange(1, MINHASH_PRIME), rng.randrange(MINHASH_PRIME))
+              for _ in range(MINHASH_PERMUTATIONS)]
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    signatures = {}
+    buckets = {}
+    ranges = []
+    for number, (start, length, title) in enumerate(chapters):
+        paragraphs = {zlib.crc32(''.join(p.split()).encode('utf-8'))
+                      for p in novel.read(start, length).split('\n') if p.strip()}
+        if len(paragraphs) < MIN_DUPLICATE_PARAGRAPHS:
+            continue
+        signature = [min((a * h + b) % MINHASH_PRIME for h in paragraphs) for a, b in params]
+        candidates = set()
+        for band in range(MINHASH_BANDS):
+            key = (band, tuple(signature[band * rows:(band + 1) * rows]))
+            candidates.update(buckets.get(key, ()))
+            buckets.setdefault(key, []).append(number)
+        signatures[number] = signature
+        for other in sorted(candidates):
+            agreement = sum(x == y for x, y in zip(signature, signatures[other])) / MINHASH_PERMUTATIONS
+            if agreement >= DUPLICATE_THRESHOLD:
+                ranges.append([start, start + length, 'duplicate', f'{title}（重复：{chapters[other][2]}）'])
+                break
+    return ranges
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for r in sorted(ranges):
+        if merged and r[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], r[1])
+        else:
+            merged.append(list(r))
+    return merged
+
+
+def read_skipping(novel, ranges, start, count):
+    """Read up to `count` characters from `start`, jumping over skip ranges.
+
+    Returns (text, end, skipped) where `end` is the true offset after the
+    last character read and `skipped` the number of characters jumped over.
+    """
+    starts = [r[0] for r in ranges]
+    i = max(bisect.bisect_right(starts, start) - 1, 0)
+    parts = []
+    have = 0
+    skipped = 0
+    pos = start
+    while have < count and pos < novel.total:
+        while i < len(ranges) and ranges[i][1] <= pos:
+            i += 1
+        if i < len(ranges) and ranges[i][0] <= pos:
+            skipped += ranges[i][1] - pos
+            pos = ranges[i][1]
+            continue
+        stop = ranges[i][0] if i < len(ranges) else novel.total
+        text = novel.read(pos, min(count - have, stop - pos))
+        parts.append(text)
+        have += len(text)
+        pos += len(text)
+    return ''.join(parts), pos, skipped
+
+
+def _encode_postings(positions):
+    # Delta-encode sorted positions as LEB128 varints.
+    out = bytearray()
+    prev = 0
+    for pos in positions:
+        delta = pos - prev
+        prev = pos
+        while delta >= 0x80:
+            out.append(delta & 0x7F | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def _decode_postings(data):
+    positions = []
+    pos = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        pos += value
+        positions.append(pos)
+        value = 0
+        shift = 0
+    return positions
+
+
+def _write_search_index(f, header, postings):
+    f.write(SEARCH_MAGIC + struct.pack('<I', len(header)) + header)
+    blobs = []
+    blob_offset = 0
+    for bigram in sorted(postings):
+        data = _encode_postings(postings[bigram])
+        f.write(_SEARCH_ENTRY.pack(ord(bigram[0]), ord(bigram[1]), blob_offset, len(postings[bigram])))
+        blobs.append(data)
+        blob_offset += len(data)
+    for data in blobs:
+        f.write(data)
+
+
+def build_search_index(filepath, index, pieces):
+    """Write a character-bigram inverted index of the novel next to it.
+
+    Layout: magic, header length, JSON header, fixed-size entries sorted by
+    bigram, then the delta/varint-compressed postings they point into.
+    Returns the index path, or an in-memory copy of the index when it
+    cannot be written.
+    """
+    postings = {}
+    offset = 0
+    prev = ''
+    for text in pieces:
+        text = prev + text
+        base = offset - len(prev)
+        for i in range(len(text) - 1):
+            bigram = text[i:i + 2]
+            positions = postings.get(bigram)
+            if positions is None:
+                positions = postings[bigram] = array.array('I')
+            positions.append(base + i)
+        offset = base + len(text)
+        prev = text[-1:]
+
+    path = filepath + SEARCH_SUFFIX
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    header = json.dumps({'version': 1, 'size': index['size'], 'mtime_ns': index['mtime_ns'],
+                         'entries': len(postings)}).encode('utf-8')
+    try:
+        with open(tmp, 'wb') as f:
+            _write_search_index(f, header, postings)
+        os.replace(tmp, path)
+    except OSError:
+        # Read-only directories still get searched, just without the saved index.
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        buffer = io.BytesIO()
+        _write_search_index(buffer, header, postings)
+        buffer.seek(0)
+        return buffer
+    return path
+
+
+class SearchIndex:
+    """Read-only view of a bigram index file (or in-memory copy); entries are binary-searched."""
+
+    def __init__(self, source):
+        self.f = open(source, 'rb') if isinstance(source, str) else source
+        if self.f.read(len(SEARCH_MAGIC)) != SEARCH_MAGIC:
+            self.f.close()
+            raise ValueError(f'not a search index: {source}')
+        length, = struct.unpack('<I', self.f.read(4))
+        self.header = json.loads(self.f.read(length).decode('utf-8'))
+        self.table = self.f.tell()
+        self.blobs = self.table + self.header['entries'] * _SEARCH_ENTRY.size
+
+    def close(self):
+        self.f.close()
+
+    def _entry(self, i):
+        self.f.seek(self.table + i * _SEARCH_ENTRY.size)
+        return _SEARCH_ENTRY.unpack(self.f.read(_SEARCH_ENTRY.size))
+
+    def postings(self, bigram):
+        key = (ord(bigram[0]), ord(bigram[1]))
+        lo, hi = 0, self.header['entries']
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[:2] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.header['entries']:
+            return []
+        c1, c2, offset, count = self._entry(lo)
+        if (c1, c2) != key:
+            return []
+        if lo + 1 < self.header['entries']:
+            end = self._entry(lo + 1)[2]
+        else:
+            end = self.f.seek(0, os.SEEK_END) - self.blobs
+        self.f.seek(self.blobs + offset)
+        return _decode_postings(self.f.read(end - offset))
+
+    def find(self, term):
+        """Return sorted start offsets of every occurrence of term (len >= 2)."""
+        lists = sorted(((self.postings(term[k:k + 2]), k) for k in range(len(term) - 1)),
+                       key=lambda item: len(item[0]))
+        positions, k0 = lists[0]
+        candidates = {pos - k0 for pos in positions}
+        for positions, k in lists[1:]:
+            if not candidates:
+                break
+            candidates &= {pos - k for pos in positions}
+        return sorted(candidates)
+
+
+class Novel:
+    """A novel file read through its offset index."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.index = load_index(filepath)
+
+    @property
+    def total(self):
+        return self.index['chars']
+
+    def read(self, start, count):
+        return read_chars(self.filepath, self.index, start, count)
+
+    def pieces(self):
+        return iter_text(self.filepath, self.index)
+
+    def chapters(self, patterns):
+        """Return (chapters, has_preface), cached in the index per pattern set."""
+        cached = self.index.get('chapters')
+        if cached and cached['patterns'] == patterns:
+            return cached['items'], cached['preface']
+        items, preface = detect_chapters(self.pieces(), patterns)
+        self.index['chapters'] = {'patterns': patterns, 'items': items, 'preface': preface}
+        save_index(self.filepath, self.index)
+        return items, preface
+
+    def segments(self, max_tokens=None):
+        """Return the start offsets of sentence-aligned segments, cached in the index.
+
+        Segments hold at most SEGMENT_SIZE characters, or at most
+        `max_tokens` estimated tokens when given.
+        """
+        key = f'tokens:{max_tokens}' if max_tokens else f'chars:{SEGMENT_SIZE}'
+        tables = self.index.setdefault('segments', {})
+        if key not in tables:
+            budget, cost = _segment_budget(key)
+            tables[key], _ = segment_starts(self.pieces(), budget, cost)
+            save_index(self.filepath, self.index)
+        return tables[key]
+
+    def skip_map(self, patterns):
+        """Return merged [start, end, reason, label] ranges to skip, cached in the index."""
+        cached = self.index.get('skip')
+        if cached and cached['patterns'] == patterns:
+            return cached['ranges']
+        chapters, _ = self.chapters(patterns)
+        ranges = detect_boilerplate(self.pieces(), patterns) + detect_duplicates(self, chapters)
+        ranges = _merge_ranges(ranges)
+        self.index['skip'] = {'patterns': patterns, 'ranges': ranges}
+        save_index(self.filepath, self.index)
+        return ranges
+
+    def search(self, term):
+        """Return sorted start offsets of term, via the bigram index for terms of 2+ characters."""
+        if not term:
+            raise ValueError('search term must not be empty')
+        if len(term) == 1:
+            return [m.start() for m in re.finditer(re.escape(term), ''.join(self.pieces()))]
+        path = self.filepath + SEARCH_SUFFIX
+        try:
+            search_index = SearchIndex(path)
+        except (OSError, ValueError):
+            search_index = None
+        if search_index and (search_index.header['size'], search_index.header['mtime_ns']) != (
+                self.index['size'], self.index['mtime_ns']):
+            search_index.close()
+            search_index = None
+        if search_index is None:
+            search_index = SearchIndex(build_search_index(self.filepath, self.index, self.pieces()))
+        try:
+            return search_index.find(term)
+        finally:
+            search_index.close()
+
+
+class ResidentNovel(Novel):
+    """A novel fully decoded in memory, used by the server."""
+
+    def __init__(self, filepath):
+        super().__init__(filepath)
+        self.content = ''.join(iter_text(filepath, self.index))
+
+    def read(self, start, count):
+        return self.content[start:start + count]
+
+    def pieces(self):
+        yield self.content
+
+
+def format_info(index):
+    return (f'总字符数: {index["chars"]}\n'
+            f'总行数: {index["lines"]}\n'
+            f'非空行数: {index["non_empty_lines"]}\n')
+
+
+def format_segment(segment, start, total, end=None, label=''):
+    if end is None:
+        end = min(start + SEGMENT_SIZE, total)
+    count = len(segment)
+    progress = (end / total * 100) if total > 0 else 0
+    return f'{segment}\n[{label}start:{start}, end:{end}, count:{count}, progress:{progress:.2f}%]\n'
+
+
+def format_chapters(chapters, has_preface):
+    first = 0 if has_preface else 1
+    lines = [f'章节数: {len(chapters) - has_preface}']
+    for number, (start, length, title) in enumerate(chapters, first):
+        parts = max(1, math.ceil(length / SEGMENT_SIZE))
+        lines.append(f'[{number}] {title} (start:{start}, length:{length}, parts:{parts})')
+    return '\n'.join(lines) + '\n'
+
+
+def read_chapter(novel, chapters, has_preface, number, part):
+    first = 0 if has_preface else 1
+    if not first <= number < first + len(chapters):
+        raise ValueError(f'chapter must be between {first} and {first + len(chapters) - 1}, got {number}')
+    start, length, _ = chapters[number - first]
+    parts = max(1, math.ceil(length / SEGMENT_SIZE))
+    if not 1 <= part <= parts:
+        raise ValueError(f'part must be between 1 and {parts}, got {part}')
+    offset = start + (part - 1) * SEGMENT_SIZE
+    segment = novel.read(offset, min(SEGMENT_SIZE, start + length - offset))
+    return format_segment(segment, offset, novel.total, end=offset + len(segment),
+                          label=f'chapter:{number}, part:{part}/{parts}, ')
+
+
+def read_segment(novel, number, max_tokens=None):
+    starts = novel.segments(max_tokens)
+    if not 1 <= number <= len(starts):
+        raise ValueError(f'segment must be between 1 and {len(starts)}, got {number}')
+    start = starts[number - 1]
+    end = starts[number] if number < len(starts) else novel.total
+    segment = novel.read(start, end - start)
+    label = f'segment:{number}/{len(starts)}, '
+    if max_tokens:
+        label += f'tokens:~{round(estimate_tokens(segment))}, '
+    return format_segment(segment, start, novel.total, end=end, label=label)
+
+
+def format_search(novel, term, context, limit):
+    positions = novel.search(term)
+    lines = [f'搜索: {term} (共 {len(positions)} 处)']
+    shown = positions[:limit] if limit > 0 else positions
+    for pos in shown:
+        before_start = max(pos - context, 0)
+        snippet = novel.read(before_start, pos - before_start + len(term) + context)
+        before = snippet[:pos - before_start]
+        after = snippet[pos - before_start + len(term):]
+        lines.append(f'[start:{pos}] {before}【{term}】{after}'.replace('\n', ' '))
+    if len(shown) < len(positions):
+        lines.append(f'（仅显示前 {len(shown)} 处，使用 --limit 0 显示全部）')
+    return '\n'.join(lines) + '\n'
+
+
+def format_skip_map(ranges):
+    skipped = sum(end - start for start, end, _, _ in ranges)
+    lines = [f'跳过区间数: {len(ranges)} (共 {skipped} 字符)']
+    for start, end, reason, label in ranges:
+        lines.append(f'[start:{start}, end:{end}] {label} ({reason})')
+    return '\n'.join(lines) + '\n'
+
+
+def execute(novel, request):
+    """Run one CLI request against a novel and return its printed output."""
+    cmd = request['cmd']
+    if cmd == 'info':
+        return format_info(novel.index)
+    if cmd == 'read':
+        start = request['start']
+        if start < 0:
+            raise ValueError(f'start must be >= 0, got {start}')
+        if request.get('skip_boilerplate'):
+            segment, end, skipped = read_skipping(novel, novel.skip_map(request['patterns']), start, SEGMENT_SIZE)
+            return format_segment(segment, start, novel.total, end=end, label=f'skipped:{skipped}, ')
+        return format_segment(novel.read(start, SEGMENT_SIZE), start, novel.total)
+    if cmd == 'segment':
+        return read_segment(novel, request['segment'], request['max_tokens'])
+    if cmd == 'search':
+        return format_search(novel, request['search'], request['context'], request['limit'])
+    if cmd == 'skip_map':
+        return format_skip_map(novel.skip_map(request['patterns']))
+    chapters, has_preface = novel.chapters(request['patterns'])
+    if cmd == 'chapters':
+        return format_chapters(chapters, has_preface)
+    if cmd == 'chapter':
+        if not chapters:
+            raise ValueError('no chapter headings found')
+        return read_chapter(novel, chapters, has_preface, request['chapter'], request['part'])
+    raise ValueError(f'unknown command: {cmd}')
+
+
+class NovelCache:
+    """LRU of fully decoded novels, invalidated when a file's size or mtime changes."""
+
+    def __init__(self, capacity):
+        self.capacity = max(capacity, 1)
+        self.novels = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, filepath):
+        st = os.stat(filepath)
+        key = (st.st_size, st.st_mtime_ns)
+        with self.lock:
+            entry = self.novels.get(filepath)
+            if entry is None or entry[0] != key:
+                entry = (key, ResidentNovel(filepath))
+                self.novels[filepath] = entry
+            self.novels.move_to_end(filepath)
+            while len(self.novels) > self.capacity:
+                self.novels.popitem(last=False)
+            return entry[1]
+
+    def handle(self, request):
+        return execute(self.get(request['path']), request)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line.decode('utf-8'))
+            response = {'ok': True, 'output': self.server.cache.handle(request)}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+
+class _ReaderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path, cache_size):
+    if os.path.exists(socket_path):
+        if query_server(socket_path, None) is not None:
+            print(f'Error: server already listening on {socket_path}', file=sys.stderr)
+            sys.exit(1)
+        os.remove(socket_path)
+    with _ReaderServer(socket_path, _RequestHandler) as server:
+        server.cache = NovelCache(cache_size)
+        print(f'novel-reader server listening on {socket_path}', file=sys.stderr)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+def query_server(socket_path, request):
+    """Send a request to a running server; return None when no server is reachable."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            if request is None:
+                return {'ok': True, 'output': ''}
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+    return json.loads(b''.join(chunks).decode('utf-8'))
 
 
 def main():
     parser = argparse.ArgumentParser(description='Read novel from specified position or get novel info')
-    parser.add_argument('filepath', help='Path to the novel file')
+    parser.add_argument('filepath', nargs='?', help='Path to the novel file')
     parser.add_argument('--info', action='store_true', help='Get novel information (character count, line count, etc.)')
     parser.add_argument('--start', type=int, default=0, help='Start position (character index, 0-based, default: 0)')
-    
+    parser.add_argument('--segment', type=int,
+                        help=f'Read sentence-aligned segment K (1-based, at most {SEGMENT_SIZE} characters each)')
+    parser.add_argument('--max-tokens', type=int,
+                        help='With --segment, size segments by an estimated token budget instead of characters')
+    parser.add_argument('--search', metavar='TERM', help='List every occurrence of TERM with surrounding context')
+    parser.add_argument('--context', type=int, default=DEFAULT_SEARCH_CONTEXT,
+                        help=f'Characters of context on each side of a search hit (default: {DEFAULT_SEARCH_CONTEXT})')
+    parser.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT,
+                        help=f'Maximum search hits to print, 0 for all (default: {DEFAULT_SEARCH_LIMIT})')
+    parser.add_argument('--skip-boilerplate', action='store_true',
+                        help='With --start, jump over author notes, ads and duplicated chapters (offsets stay true)')
+    parser.add_argument('--skip-map', action='store_true', help='List the ranges --skip-boilerplate jumps over')
+    parser.add_argument('--chapters', action='store_true', help='List detected chapters with offsets and lengths')
+    parser.add_argument('--chapter', type=int, help='Read chapter N (as numbered by --chapters)')
+    parser.add_argument('--part', type=int, default=1, help=f'Part K of the chapter, {SEGMENT_SIZE} characters each (default: 1)')
+    parser.add_argument('--chapter-pattern', action='append', dest='chapter_patterns', metavar='REGEX',
+                        help='Chapter heading regex, matched at the start of a stripped line (repeatable; replaces the defaults)')
+    parser.add_argument('--compress', action='store_true',
+                        help=f'Convert the .txt novel into a seekable compressed {PACK_SUFFIX} file')
+    parser.add_argument('--output', help=f'Output path for --compress (default: same name with {PACK_SUFFIX})')
+    parser.add_argument('--codec', choices=sorted(PACK_CODECS), default=DEFAULT_PACK_CODEC,
+                        help=f'Compression codec for --compress (default: {DEFAULT_PACK_CODEC})')
+    parser.add_argument('--serve', action='store_true', help='Run a resident server that keeps recently read novels in memory')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f'Unix socket of the resident server (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f'Number of novels the server keeps in memory (default: {DEFAULT_CACHE_SIZE})')
+
     args = parser.parse_args()
-    
+
+    if args.serve:
+        serve(args.socket, args.cache_size)
+        return
+    if not args.filepath:
+        parser.error('the following arguments are required: filepath')
+
+    if args.compress:
+        output = args.output or os.path.splitext(args.filepath)[0] + PACK_SUFFIX
+        try:
+            pack_novel(args.filepath, output, args.codec)
+        except Exception as e:
+            print(f'Error: {e}', file=sys.stderr)
+            sys.exit(1)
+        src_size, dst_size = os.path.getsize(args.filepath), os.path.getsize(output)
+        print(f'压缩完成: {output} ({src_size} -> {dst_size} 字节, {src_size / max(dst_size, 1):.2f}x)')
+        return
+
     if args.info:
-        get_novel_info(args.filepath)
+        cmd = 'info'
+    elif args.search is not None:
+        cmd = 'search'
+    elif args.skip_map:
+        cmd = 'skip_map'
+    elif args.chapters:
+        cmd = 'chapters'
+    elif args.chapter is not None:
+        cmd = 'chapter'
+    elif args.segment is not None:
+        cmd = 'segment'
     else:
-        read_novel_segment(args.filepath, args.start)
+        cmd = 'read'
+    request = {
+        'cmd': cmd,
+        'path': os.path.abspath(args.filepath),
+        'start': args.start,
+        'segment': args.segment,
+        'max_tokens': args.max_tokens,
+        'skip_boilerplate': args.skip_boilerplate,
+        'search': args.search,
+        'context': args.context,
+        'limit': args.limit,
+        'chapter': args.chapter,
+        'part': args.part,
+        'patterns': args.chapter_patterns or DEFAULT_CHAPTER_PATTERNS,
+    }
+    response = query_server(args.socket, request)
+    if response is None:
+        try:
+            response = {'ok': True, 'output': execute(Novel(args.filepath), request)}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+    if not response['ok']:
+        print(f'Error: {response["error"]}', file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.write(response['output'])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for novel_store.py.
+
+Usage:
+    python3 -m unittest test_novel_store
+"""
+
+import tempfile
+import unittest
+
+from novel_store import NovelStore
+
+
+class FindAssetsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = NovelStore(self.tmp.name)
+        self.store.upsert_asset('角色', '萧炎', {'基本信息.性别': '男'})
+        self.store.upsert_asset('道具', '萧炎的戒指', notes='药老藏身其中')
+        self.store.upsert_asset('场景', '云岚宗', notes='萧炎三年之约的地点')
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def names(self, query, type_=None):
+        return [asset['name'] for asset in self.store.find_assets(query, type_)]
+
+    def test_short_query_filters_by_type(self):
+        # Under 3 characters the search goes through LIKE on name and body.
+        self.assertEqual(sorted(self.names('萧炎')), sorted(['萧炎', '萧炎的戒指', '云岚宗']))
+        self.assertEqual(self.names('萧炎', '角色'), ['萧炎'])
+        self.assertEqual(self.names('萧炎', '道具'), ['萧炎的戒指'])
+
+    def test_long_query_filters_by_type(self):
+        self.assertEqual(self.names('萧炎的'), ['萧炎的戒指'])
+        self.assertEqual(self.names('三年之约', '角色'), [])
+        self.assertEqual(self.names('三年之约', '场景'), ['云岚宗'])
+
+
+if __name__ == '__main__':
+    unittest.main()